@@ -4,6 +4,7 @@ Base agent class implementing ReAct (Reasoning + Acting) pattern
 for agentic AI capabilities
 """
 from services.llm_service import LLMService
+from services.reasoning_traces import get_trace_store
 import json
 import re
 
@@ -164,6 +165,13 @@ Continue this pattern until you reach a Final Answer."""
             'warning': 'Max iterations reached'
         }
     
+    def defer_reason(self, kind, prompt, context=None):
+        """
+        Advisory reasoning nothing on the request path reads: run it according to
+        AGENT_REASONING_MODE (background by default) and return the trace id
+        """
+        return get_trace_store().submit(self, kind, prompt, context=context)
+    
     def simple_reason(self, prompt, context=None):
         """
         Simplified reasoning without ReAct loop - just LLM reasoning
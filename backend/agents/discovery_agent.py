@@ -1,10 +1,27 @@
 # agents/discovery_agent.py
-import feedparser
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from agents.base_agent import BaseAgent
+from services.arxiv_harvester import ArxivHarvester, build_search_query
+from services.corpus_discovery import iter_discovery
+from services.fingerprint import normalize_paper_id
+from services.paper_fetcher import DISCOVERY_CITATIONS, PaperFetcher
+from services.reasoning_traces import get_trace_store
+from services.relevance_service import RELEVANCE_THRESHOLD, RelevanceService
+from utils.rate_limit import TokenBucket
 import json
+import os
+import re
 
-ARXIV_API = "http://export.arxiv.org/api/query"
+DISCOVERY_MAX_QUERIES = int(os.getenv("DISCOVERY_MAX_QUERIES", "4"))
+DISCOVERY_FANOUT_WORKERS = int(os.getenv("DISCOVERY_FANOUT_WORKERS", "4"))
+# Searches started per second across all fan-outs (the harvester still spaces real arXiv calls)
+DISCOVERY_FANOUT_RATE = float(os.getenv("DISCOVERY_FANOUT_RATE", "2"))
+RRF_K = 60
+# Drop papers whose embedding is not similar enough to the query before they reach later stages
+DISCOVERY_RELEVANCE_FILTER = os.getenv("DISCOVERY_RELEVANCE_FILTER", "true").lower() not in ("0", "false", "no")
+
+fanout_bucket = TokenBucket(rate=DISCOVERY_FANOUT_RATE, capacity=DISCOVERY_FANOUT_WORKERS)
 
 class DiscoveryAgent(BaseAgent):
     """Agentic discovery agent with LLM reasoning for paper search optimization"""
@@ -18,7 +35,7 @@ class DiscoveryAgent(BaseAgent):
             },
             {
                 'name': 'filter_by_relevance',
-                'description': 'Filter papers by relevance score. Input: {"papers": [...], "min_relevance": 0.7}',
+                'description': 'Filter papers by embedding similarity to a query. Input: {"query": "search terms", "papers": [...], "min_relevance": 0.3, "top_k": 20}',
                 'func': self._filter_relevance_tool
             }
         ]
@@ -27,6 +44,10 @@ class DiscoveryAgent(BaseAgent):
             description="An AI agent that discovers and retrieves research papers from arXiv with intelligent query optimization and relevance filtering",
             tools=tools
         )
+        self.harvester = ArxivHarvester()
+        self.paper_fetcher = PaperFetcher()
+        self.relevance_service = RelevanceService()
+        self.last_fetch_stats = {}
     
     def _search_arxiv_tool(self, input_data):
         """Tool function for searching arXiv"""
@@ -36,22 +57,7 @@ class DiscoveryAgent(BaseAgent):
         query = input_data.get('query', '')
         max_results = input_data.get('max_results', 50)
         
-        search_query = f"all:{query}"
-        url = f"{ARXIV_API}?search_query={search_query}&start=0&max_results={max_results}"
-        feed = feedparser.parse(url)
-        
-        papers = []
-        for entry in feed.entries:
-            year = int(entry.published[:4])
-            papers.append({
-                "paper_id": entry.id,
-                "title": entry.title.strip(),
-                "abstract": entry.summary.strip(),
-                "authors": [a.name for a in entry.authors],
-                "year": year,
-                "venue": "arXiv",
-                "url": entry.link
-            })
+        papers = self.harvester.harvest(build_search_query(query), max_results)
         
         return json.dumps(papers, indent=2)
     
@@ -61,64 +67,135 @@ class DiscoveryAgent(BaseAgent):
             input_data = json.loads(input_data)
         
         papers = input_data.get('papers', [])
-        min_relevance = input_data.get('min_relevance', 0.7)
+        query = input_data.get('query', '')
+        if not query:
+            return json.dumps({"error": "filter_by_relevance needs a 'query' to score papers against"})
         
-        # Simple relevance based on keyword matching (can be enhanced)
-        filtered = []
-        for paper in papers:
-            # Placeholder relevance score
-            relevance = 0.8  # Default
-            if relevance >= min_relevance:
-                filtered.append(paper)
+        filtered = self.relevance_service.filter(
+            query,
+            papers,
+            threshold=input_data.get('min_relevance', RELEVANCE_THRESHOLD),
+            top_k=input_data.get('top_k')
+        )
         
         return json.dumps(filtered, indent=2)
     
-    def fetch_papers(self, query, start_year=2015, end_year=None, max_results=50):
+    def expand_query(self, query, start_year, end_year, max_queries=DISCOVERY_MAX_QUERIES):
+        """Ask the LLM for alternative search queries; returns [query, *expansions]"""
+        prompt = f"""I need to discover research papers for the query: "{query}"
+The time range is {start_year}-{end_year}.
+
+Suggest up to {max_queries - 1} alternative arXiv search queries (synonyms, related
+terms, narrower sub-topics) that would find relevant papers the original query misses.
+
+Return ONLY a JSON array of query strings, e.g. ["query one", "query two"]."""
+        
+        reasoning = self.simple_reason(prompt)
+        reasoning['trace_id'] = get_trace_store().record(self.name, 'search_strategy', prompt, reasoning)
+        queries = [query]
+        if reasoning.get('fallback') or not reasoning.get('result'):
+            return queries, reasoning
+        
+        json_match = re.search(r'\[[^\]]*\]', reasoning['result'], re.DOTALL)
+        if json_match:
+            try:
+                suggestions = json.loads(json_match.group(0))
+            except ValueError:
+                suggestions = []
+            seen = {query.lower().strip()}
+            for suggestion in suggestions:
+                if not isinstance(suggestion, str) or suggestion.lower().strip() in seen:
+                    continue
+                seen.add(suggestion.lower().strip())
+                queries.append(suggestion.strip())
+        return queries[:max_queries], reasoning
+    
+    def _fetch_one(self, query, start_year, end_year, max_results):
+        """Fetch one query under the fan-out rate limit; returns (papers, stats)"""
+        fanout_bucket.acquire()
+        stats = {}
+        papers = []
+        for page in iter_discovery(query, start_year, end_year, max_results, stats, harvester=self.harvester):
+            papers.extend(page)
+        return papers, stats
+    
+    def fan_out(self, queries, start_year, end_year, max_results):
+        """Run every query concurrently, merge results deduplicated on normalized arXiv id and score them.
+
+        Scores use reciprocal-rank fusion, so papers ranked highly by several
+        queries come first; the original query (first in the list) counts double.
         """
-        Fetch papers with LLM reasoning to optimize search strategy
+        workers = max(1, min(len(queries), DISCOVERY_FANOUT_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="discovery-fanout") as executor:
+            futures = [executor.submit(self._fetch_one, q, start_year, end_year, max_results) for q in queries]
+            results = []
+            for q, future in zip(queries, futures):
+                try:
+                    results.append((q, *future.result()))
+                except Exception as e:
+                    print(f"Search for '{q}' failed: {e}")
+                    results.append((q, [], {"error": str(e)}))
+        
+        merged = {}
+        fetched = 0
+        for index, (q, papers, _) in enumerate(results):
+            weight = 2.0 if index == 0 else 1.0
+            fetched += len(papers)
+            for rank, paper in enumerate(papers):
+                identity = normalize_paper_id(paper["paper_id"])
+                entry = merged.get(identity)
+                if entry is None:
+                    entry = merged[identity] = {**paper, "discovery_score": 0.0, "matched_queries": []}
+                entry["discovery_score"] += weight / (RRF_K + rank + 1)
+                entry["matched_queries"].append(q)
+        
+        ranked = sorted(merged.values(), key=lambda p: p["discovery_score"], reverse=True)[:max_results]
+        for paper in ranked:
+            paper["discovery_score"] = round(paper["discovery_score"], 6)
+        
+        self.last_fetch_stats = {
+            "queries": {q: stats for q, _, stats in results},
+            "fetched": fetched,
+            "unique": len(merged),
+            "duplicates": fetched - len(merged),
+            "returned": len(ranked)
+        }
+        return ranked
+    
+    def filter_relevant(self, query, papers):
+        """Relevance-filter papers against the original query; on embedding failure keep them all"""
+        try:
+            filtered = self.relevance_service.filter(query, papers)
+        except Exception as e:
+            print(f"Warning: relevance filtering skipped: {e}")
+            return papers
+        self.last_fetch_stats["relevance_dropped"] = len(papers) - len(filtered)
+        return filtered
+    
+    def fetch_papers(self, query, start_year=2015, end_year=None, max_results=50, queries=None):
+        """
+        Fetch papers, fanning out over several search queries.
+        
+        queries, if given, is the list of searches to run; otherwise the LLM
+        proposes expansions of query (falling back to query alone).
         """
         if end_year is None:
             end_year = datetime.now().year
         
-        # Use LLM to reason about the best search strategy
-        reasoning_prompt = f"""I need to discover research papers for the query: "{query}"
-
-Consider:
-- The query might need refinement or expansion
-- Different search terms might yield better results
-- The time range is {start_year}-{end_year}
-- I need up to {max_results} papers
-
-Should I:
-1. Use the query as-is
-2. Expand the query with related terms
-3. Use multiple search queries and combine results
-
-Provide reasoning and then execute the search."""
-        
-        # Get LLM reasoning
-        reasoning_result = self.simple_reason(reasoning_prompt)
+        if queries:
+            queries = list(dict.fromkeys(queries))
+            reasoning_result = {'result': None, 'supplied_queries': queries}
+        else:
+            queries, reasoning_result = self.expand_query(query, start_year, end_year)
         
-        # Execute search (with or without LLM optimization)
-        search_query = f"all:{query}"
-        url = f"{ARXIV_API}?search_query={search_query}&start=0&max_results={max_results}"
-        feed = feedparser.parse(url)
+        papers = self.fan_out(queries, start_year, end_year, max_results)
+        if DISCOVERY_RELEVANCE_FILTER and papers:
+            papers = self.filter_relevant(query, papers)
+        if DISCOVERY_CITATIONS and papers:
+            self.paper_fetcher.attach_citations(papers)
         
-        papers = []
-        for entry in feed.entries:
-            year = int(entry.published[:4])
-            if start_year <= year <= end_year:
-                papers.append({
-                    "paper_id": entry.id,
-                    "title": entry.title.strip(),
-                    "abstract": entry.summary.strip(),
-                    "authors": [a.name for a in entry.authors],
-                    "year": year,
-                    "venue": "arXiv",
-                    "url": entry.link
-                })
-        
-        # Use LLM to reason about paper quality and relevance (optional)
+        # Quality analysis is advisory only, so it runs off the request path
+        self.last_reasoning = {'search_strategy': reasoning_result}
         if papers:
             quality_prompt = f"""I found {len(papers)} papers for query "{query}". 
 
@@ -132,12 +209,8 @@ First {min(5, len(papers))} paper titles:
 
 Provide reasoning about paper relevance."""
             
-            quality_reasoning = self.simple_reason(quality_prompt, context={'papers': papers[:5]})
-            # Store reasoning for debugging (only if LLM succeeded)
-            if not quality_reasoning.get('fallback'):
-                self.last_reasoning = {
-                    'search_strategy': reasoning_result,
-                    'quality_analysis': quality_reasoning
-                }
+            self.last_reasoning['quality_analysis_trace'] = self.defer_reason(
+                'quality_analysis', quality_prompt, context={'papers': [dict(p) for p in papers[:5]]}
+            )
         
         return papers
@@ -145,7 +145,7 @@ Return as JSON with file names as keys and descriptions as values."""
         if not viable_gaps:
             return experiments
         
-        # Use LLM to reason about experiment strategy
+        # Reason about experiment strategy off the request path (the trace is kept for inspection)
         strategy_prompt = f"""I need to propose experiments for {len(viable_gaps)} research gaps.
 
 Each experiment should:
@@ -156,8 +156,7 @@ Each experiment should:
 
 What approach should I take for experiment design?"""
         
-        strategy_result = self.simple_reason(strategy_prompt)
-        strategy = strategy_result.get('result') or strategy_result.get('reasoning') or ''
+        self.defer_reason('experiment_strategy', strategy_prompt)
         
         # Design experiments for each gap
         for gap in viable_gaps:
@@ -85,7 +85,7 @@ Return as JSON: {{"methods": [...], "datasets": [...], "metrics": [...]}}"""
         """
         extracted = []
         
-        # Use LLM to reason about extraction strategy
+        # Reason about extraction strategy off the request path (the trace is kept for inspection)
         strategy_prompt = f"""I need to extract research entities from {len(papers)} papers.
 
 I should extract:
@@ -100,8 +100,7 @@ Should I:
 
 Provide reasoning."""
         
-        strategy_result = self.simple_reason(strategy_prompt)
-        strategy = strategy_result.get('result') or strategy_result.get('reasoning') or ''
+        self.defer_reason('extraction_strategy', strategy_prompt)
         
         # Process papers
         for i, p in enumerate(papers):
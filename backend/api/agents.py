@@ -0,0 +1,28 @@
+# api/agents.py
+from flask import Blueprint, jsonify, request
+from services.reasoning_traces import get_trace_store
+
+agents_bp = Blueprint("agents", __name__)
+
+@agents_bp.route("/traces", methods=["GET"])
+def list_traces():
+    """Recent agent reasoning traces, newest first (filters: agent, kind, status, limit)"""
+    store = get_trace_store()
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    traces = store.list(
+        agent=request.args.get("agent"),
+        kind=request.args.get("kind"),
+        status=request.args.get("status"),
+        limit=limit
+    )
+    return jsonify({"traces": traces, "stats": store.stats()})
+
+@agents_bp.route("/traces/<trace_id>", methods=["GET"])
+def get_trace(trace_id):
+    trace = get_trace_store().get(trace_id)
+    if trace is None:
+        return jsonify({"error": f"Trace '{trace_id}' not found"}), 404
+    return jsonify(trace)
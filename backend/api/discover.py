@@ -1,92 +1,144 @@
 # api/discover.py
-import requests
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-import feedparser
+import time
 import traceback
+from services.arxiv_harvester import ArxivHarvester
+from services.corpus_discovery import iter_discovery
 from services.data_cache import DataCache
+from services.dedup_service import DedupService
+from services.paper_fetcher import DISCOVERY_CITATIONS, DISCOVERY_CITATIONS_BUDGET, PaperFetcher
+from utils.sse import sse_event, sse_response
 
 discover_bp = Blueprint("discover", __name__)
 data_cache = DataCache()
+harvester = ArxivHarvester()
+paper_fetcher = PaperFetcher()
 
-ARXIV_API = "http://export.arxiv.org/api/query"
+def iter_arxiv_pages(query, start_year, end_year, max_results, stats=None, dedup=None):
+    """Yield lists of in-window papers, from the local corpus when its coverage is fresh, else from arXiv.
 
-def fetch_arxiv(query, start_year, end_year, max_results):
+    Near-duplicates (other versions, preprint vs. journal copies) are merged or
+    flagged across pages according to DEDUP_MODE; pass dedup to read merges
+    into papers from earlier pages with its pop_merged(). Citation lookups share one
+    DISCOVERY_CITATIONS_BUDGET for the whole request, so a slow or rate-limited
+    Semantic Scholar cannot hold discovery up.
+    """
+    dedup = dedup or DedupService()
+    citations_deadline = time.monotonic() + DISCOVERY_CITATIONS_BUDGET
+    for page in iter_discovery(query, start_year, end_year, max_results, stats, harvester=harvester):
+        page = dedup.process(page)
+        if stats is not None:
+            stats["duplicates"] = dedup.stats["duplicates"]
+        if DISCOVERY_CITATIONS and page:
+            paper_fetcher.attach_citations(page, citations_deadline)
+        yield page
+
+def fetch_arxiv(query, start_year, end_year, max_results, stats=None):
     """Fetch papers from arXiv API"""
     try:
-        # URL encode the query properly
-        from urllib.parse import quote_plus
-        search_query = f"all:{quote_plus(query)}"
-        url = f"{ARXIV_API}?search_query={search_query}&start=0&max_results={max_results}"
-        
-        # Parse the feed
-        feed = feedparser.parse(url)
-        
-        # Check for errors in the feed
-        if feed.bozo and feed.bozo_exception:
-            raise Exception(f"Feed parsing error: {feed.bozo_exception}")
-
         papers = []
-        for entry in feed.entries:
-            try:
-                # Extract year from published date
-                published = entry.get("published", "")
-                if not published:
-                    continue
-                    
-                year = int(published[:4])
-                if start_year <= year <= end_year:
-                    papers.append({
-                        "paper_id": entry.get("id", ""),
-                        "title": entry.get("title", "Untitled").replace("\n", " ").strip(),
-                        "abstract": entry.get("summary", "").replace("\n", " ").strip(),
-                        "authors": [a.name for a in entry.get("authors", [])],
-                        "year": year,
-                        "venue": "arXiv",
-                        "url": entry.get("link", "")
-                    })
-            except (ValueError, KeyError, AttributeError) as e:
-                # Skip entries with invalid data
-                print(f"Warning: Skipping entry due to error: {e}")
-                continue
-                
+        for page in iter_arxiv_pages(query, start_year, end_year, max_results, stats):
+            papers.extend(page)
         return papers
     except Exception as e:
         print(f"Error fetching from arXiv: {e}")
         print(traceback.format_exc())
         raise
 
+def parse_discover_request(data):
+    """Validate a discover request body; returns (params, error_response)"""
+    if not data:
+        return None, (jsonify({"error": "No JSON data provided"}), 400)
+
+    if "query" not in data:
+        return None, (jsonify({"error": "Missing 'query' parameter"}), 400)
+
+    query = data["query"].strip()
+    if not query:
+        return None, (jsonify({"error": "Query cannot be empty"}), 400)
+
+    return {
+        "query": query,
+        "start_year": data.get("start_year", 2015),
+        "end_year": data.get("end_year", datetime.now().year),
+        "max_results": data.get("max_results", 50)
+    }, None
+
 @discover_bp.route("/", methods=["POST"])
 def discover():
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-            
-        if "query" not in data:
-            return jsonify({"error": "Missing 'query' parameter"}), 400
-        
-        query = data["query"].strip()
-        if not query:
-            return jsonify({"error": "Query cannot be empty"}), 400
-        
+        params, error = parse_discover_request(request.json)
+        if error:
+            return error
+
+        stats = {}
         papers = fetch_arxiv(
-            query,
-            data.get("start_year", 2015),
-            data.get("end_year", datetime.now().year),
-            data.get("max_results", 50)
+            params["query"],
+            params["start_year"],
+            params["end_year"],
+            params["max_results"],
+            stats
         )
-        
-        # Clear cache when new papers are discovered (new topic/query)
-        # This ensures clusters and synthesis are regenerated for the new topic
-        if papers and len(papers) > 0:
-            print(f"New papers discovered ({len(papers)} papers), clearing cache...")
-            cleared_count = data_cache.clear_cache()
-            print(f"Cache cleared: {cleared_count} files removed")
-        
-        return jsonify(papers)
+        print(f"arXiv fetch for '{params['query']}': {stats}")
+
+        # Register the corpus under this query's namespace. Cache keys are corpus
+        # fingerprints, so a new topic never sees stale clusters, and other topics
+        # keep their warm entries; eviction is LRU/TTL under DATA_CACHE_MAX_BYTES.
+        if papers:
+            data_cache.register_corpus(papers, namespace=params["query"])
+
+        response = jsonify(papers)
+        response.headers["X-Arxiv-Fetched"] = str(stats["fetched"])
+        response.headers["X-Arxiv-Kept"] = str(stats["kept"])
+        response.headers["X-Arxiv-Discarded"] = str(stats["discarded"])
+        response.headers["X-Corpus-Source"] = stats["source"]
+        response.headers["X-Dedup-Duplicates"] = str(stats.get("duplicates", 0))
+        return response
     except Exception as e:
         error_msg = str(e)
         print(f"Error in discover endpoint: {error_msg}")
         print(traceback.format_exc())
         return jsonify({"error": error_msg, "type": type(e).__name__}), 500
+
+@discover_bp.route("/stream", methods=["POST"])
+def discover_stream():
+    """Same as / but emits each page of papers as a Server-Sent Event as soon as it is parsed.
+
+    A page may hold copies of papers already sent; those are not sent again but
+    reported in a "merged" event mapping each earlier paper_id to its full merged_ids.
+    """
+    params, error = parse_discover_request(request.json)
+    if error:
+        return error
+
+    def events():
+        papers = []
+        stats = {}
+        dedup = DedupService()
+        try:
+            yield sse_event("start", {"query": params["query"], "max_results": params["max_results"]})
+            pages = iter_arxiv_pages(
+                params["query"],
+                params["start_year"],
+                params["end_year"],
+                params["max_results"],
+                stats,
+                dedup
+            )
+            for page in pages:
+                papers.extend(page)
+                merged = dedup.pop_merged()
+                if merged:
+                    yield sse_event("merged", {"merged": merged})
+                yield sse_event("papers", {"papers": page, "total": len(papers)})
+
+            if papers:
+                data_cache.register_corpus(papers, namespace=params["query"])
+            yield sse_event("done", {"count": len(papers), "stats": stats})
+        except Exception as e:
+            print(f"Error in discover stream: {e}")
+            print(traceback.format_exc())
+            yield sse_event("error", {"error": str(e), "type": type(e).__name__, "count": len(papers)})
+
+    return sse_response(events())
@@ -2,6 +2,7 @@
 from flask import Blueprint, jsonify, request
 from services.knowledge_base import KnowledgeBase
 from services.llm_service import LLMService
+from utils.sse import sse_event, sse_response
 import json
 
 paper_generation_bp = Blueprint("paper_generation", __name__)
@@ -67,97 +68,100 @@ def format_context_for_llm(context, content_map):
     
     return "\n".join(formatted) if formatted else "No relevant context found."
 
-@paper_generation_bp.route("/generate", methods=["POST"])
-def generate_paper():
+def prepare_paper_generation(data):
+    """Build the knowledge base and RAG prompt for a paper request.
+
+    Returns (prepared, None) on success, or (None, error_response) when the
+    request cannot be served. "force_regenerate": true asks for a new draft
+    instead of the cached one for the same prompt.
+    """
+    topic = data.get("topic", "")
+    papers = data.get("papers", [])
+    clusters = data.get("clusters", [])
+    synthesis = data.get("synthesis", {})
+    gaps = data.get("gaps", [])
+    experiments = data.get("experiments", [])
+    
+    if not topic:
+        return None, (jsonify({"error": "Topic is required"}), 400)
+    
+    if not papers:
+        return None, (jsonify({"error": "No papers available. Please discover papers first."}), 400)
+    
+    # Transform clusters from frontend format to backend format if needed
+    transformed_clusters = []
+    if clusters:
+        for cluster in clusters:
+            # Check if already in backend format
+            if "cluster_id" in cluster:
+                transformed_clusters.append(cluster)
+            else:
+                # Transform from frontend format
+                transformed_cluster = {
+                    "cluster_id": str(cluster.get("id", cluster.get("cluster_id", ""))),
+                    "name": cluster.get("name", ""),
+                    "paper_count": cluster.get("papers", cluster.get("paper_count", 0)),
+                    "key_papers": cluster.get("keyPapers", cluster.get("key_papers", [])),
+                    "trajectory": cluster.get("trajectoryStatus", cluster.get("trajectory", "stable")),
+                    "papers": cluster.get("papersData", cluster.get("papers", []))
+                }
+                transformed_clusters.append(transformed_cluster)
+    
+    # Build knowledge base
     try:
-        data = request.json
-        topic = data.get("topic", "")
-        papers = data.get("papers", [])
-        clusters = data.get("clusters", [])
-        synthesis = data.get("synthesis", {})
-        gaps = data.get("gaps", [])
-        experiments = data.get("experiments", [])
-        
-        if not topic:
-            return jsonify({"error": "Topic is required"}), 400
-        
-        if not papers:
-            return jsonify({"error": "No papers available. Please discover papers first."}), 400
+        kb_size = knowledge_base.build_knowledge_base(
+            papers=papers,
+            clusters=transformed_clusters,
+            synthesis=synthesis,
+            gaps=gaps,
+            experiments=experiments
+        )
         
-        # Transform clusters from frontend format to backend format if needed
-        transformed_clusters = []
-        if clusters:
-            for cluster in clusters:
-                # Check if already in backend format
-                if "cluster_id" in cluster:
-                    transformed_clusters.append(cluster)
-                else:
-                    # Transform from frontend format
-                    transformed_cluster = {
-                        "cluster_id": str(cluster.get("id", cluster.get("cluster_id", ""))),
-                        "name": cluster.get("name", ""),
-                        "paper_count": cluster.get("papers", cluster.get("paper_count", 0)),
-                        "key_papers": cluster.get("keyPapers", cluster.get("key_papers", [])),
-                        "trajectory": cluster.get("trajectoryStatus", cluster.get("trajectory", "stable")),
-                        "papers": cluster.get("papersData", cluster.get("papers", []))
-                    }
-                    transformed_clusters.append(transformed_cluster)
-        
-        # Build knowledge base
-        try:
-            kb_size = knowledge_base.build_knowledge_base(
-                papers=papers,
-                clusters=transformed_clusters,
-                synthesis=synthesis,
-                gaps=gaps,
-                experiments=experiments
-            )
-            
-            if not kb_size or kb_size == 0:
-                return jsonify({
-                    "error": "Failed to build knowledge base",
-                    "details": "No content available to build knowledge base. Please ensure you have papers, clusters, or synthesis data."
-                }), 500
-        except Exception as e:
-            print(f"Error building knowledge base: {e}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({
-                "error": f"Failed to build knowledge base: {str(e)}"
-            }), 500
+        if not kb_size or kb_size == 0:
+            return None, (jsonify({
+                "error": "Failed to build knowledge base",
+                "details": "No content available to build knowledge base. Please ensure you have papers, clusters, or synthesis data."
+            }), 500)
+    except Exception as e:
+        print(f"Error building knowledge base: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, (jsonify({
+            "error": f"Failed to build knowledge base: {str(e)}"
+        }), 500)
+    
+    # Get relevant context
+    try:
+        context = knowledge_base.get_context_for_paper_generation(topic, max_chunks=15)
         
-        # Get relevant context
-        try:
-            context = knowledge_base.get_context_for_paper_generation(topic, max_chunks=15)
-            
-            # Get full content for retrieved items
-            content_map = knowledge_base.get_full_content(
-                papers=papers,
-                clusters=transformed_clusters,
-                synthesis=synthesis,
-                gaps=gaps,
-                experiments=experiments
-            )
-            
-            context_text = format_context_for_llm(context, content_map)
-            
-            if not context_text or len(context_text.strip()) < 50:
-                return jsonify({
-                    "error": "Insufficient context for paper generation",
-                    "details": "The knowledge base does not contain enough relevant content for the given topic. Please ensure you have generated clusters and synthesis data."
-                }), 400
-        except Exception as e:
-            print(f"Error getting context: {e}")
-            return jsonify({
-                "error": f"Failed to retrieve context: {str(e)}"
-            }), 500
+        # Get full content for retrieved items
+        content_map = knowledge_base.get_full_content(
+            papers=papers,
+            clusters=transformed_clusters,
+            synthesis=synthesis,
+            gaps=gaps,
+            experiments=experiments
+        )
         
-        # Generate paper using RAG
-        print(f"Generating paper on topic: {topic}")
-        print(f"Context text length: {len(context_text)}")
-        print(f"Context preview: {context_text[:200]}...")
+        context_text = format_context_for_llm(context, content_map)
         
-        prompt = f"""You are a research paper writer. Generate a comprehensive research paper on the topic: "{topic}"
+        if not context_text or len(context_text.strip()) < 50:
+            return None, (jsonify({
+                "error": "Insufficient context for paper generation",
+                "details": "The knowledge base does not contain enough relevant content for the given topic. Please ensure you have generated clusters and synthesis data."
+            }), 400)
+    except Exception as e:
+        print(f"Error getting context: {e}")
+        return None, (jsonify({
+            "error": f"Failed to retrieve context: {str(e)}"
+        }), 500)
+    
+    # Generate paper using RAG
+    print(f"Generating paper on topic: {topic}")
+    print(f"Context text length: {len(context_text)}")
+    print(f"Context preview: {context_text[:200]}...")
+    
+    prompt = f"""You are a research paper writer. Generate a comprehensive research paper on the topic: "{topic}"
 
 Use the following knowledge base as context:
 
@@ -174,9 +178,64 @@ Generate a research paper with the following structure:
 
 Write in academic style, cite relevant work from the context, and ensure the paper is coherent and well-structured. Use **bold** for section headers and key terms."""
 
+    return {
+        "topic": topic,
+        "prompt": prompt,
+        "context": context,
+        "force_regenerate": bool(data.get("force_regenerate", False))
+    }, None
+
+def context_summary(context):
+    """Count the retrieved knowledge base items by type"""
+    return {
+        "papers": len(context.get("papers", [])),
+        "synthesis": len(context.get("synthesis", [])),
+        "gaps": len(context.get("gaps", [])),
+        "experiments": len(context.get("experiments", []))
+    }
+
+def llm_error_payload(e):
+    """Describe an LLM failure in the shape the frontend expects"""
+    if isinstance(e, ValueError):
+        # Handle specific LLM errors (CUDA, model not found, etc.)
+        error_msg = str(e)
+        print(f"LLM error: {error_msg}")
+        return {
+            "error": "LLM Generation Failed",
+            "details": error_msg,
+            "type": "llm_error"
+        }
+    if isinstance(e, ConnectionError):
+        print(f"Connection error: {e}")
+        return {
+            "error": "Cannot connect to Ollama",
+            "details": str(e),
+            "suggestion": "Please ensure Ollama is running: ollama serve",
+            "type": "connection_error"
+        }
+    print(f"Error generating paper with LLM: {e}")
+    import traceback
+    traceback.print_exc()
+    return {
+        "error": f"Failed to generate paper: {str(e)}",
+        "suggestion": "Please ensure Ollama is running and the model is available.",
+        "type": "unknown_error"
+    }
+
+@paper_generation_bp.route("/generate", methods=["POST"])
+def generate_paper():
+    try:
+        prepared, error_response = prepare_paper_generation(request.json or {})
+        if error_response:
+            return error_response
+        topic = prepared["topic"]
+        prompt = prepared["prompt"]
+        context = prepared["context"]
+        
         try:
             print("Calling LLM service to generate paper...")
-            paper_content = llm_service.generate(prompt, temperature=0.7)
+            paper_content = llm_service.generate(prompt, temperature=0.7,
+                                                 use_cache=not prepared["force_regenerate"])
             print(f"Paper generated successfully, length: {len(paper_content)}")
             
             if not paper_content or len(paper_content.strip()) < 100:
@@ -185,42 +244,13 @@ Write in academic style, cite relevant work from the context, and ensure the pap
                     "details": "The LLM returned insufficient content. Please try again or check if the model is working properly."
                 }), 500
                 
-        except ValueError as e:
-            # Handle specific LLM errors (CUDA, model not found, etc.)
-            error_msg = str(e)
-            print(f"LLM error: {error_msg}")
-            return jsonify({
-                "error": "LLM Generation Failed",
-                "details": error_msg,
-                "type": "llm_error"
-            }), 500
-        except ConnectionError as e:
-            print(f"Connection error: {e}")
-            return jsonify({
-                "error": "Cannot connect to Ollama",
-                "details": str(e),
-                "suggestion": "Please ensure Ollama is running: ollama serve",
-                "type": "connection_error"
-            }), 500
         except Exception as e:
-            print(f"Error generating paper with LLM: {e}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({
-                "error": f"Failed to generate paper: {str(e)}",
-                "suggestion": "Please ensure Ollama is running and the model is available.",
-                "type": "unknown_error"
-            }), 500
+            return jsonify(llm_error_payload(e)), 500
         
         return jsonify({
             "topic": topic,
             "paper": paper_content,
-            "context_used": {
-                "papers": len(context.get("papers", [])),
-                "synthesis": len(context.get("synthesis", [])),
-                "gaps": len(context.get("gaps", [])),
-                "experiments": len(context.get("experiments", []))
-            }
+            "context_used": context_summary(context)
         })
         
     except Exception as e:
@@ -232,6 +262,50 @@ Write in academic style, cite relevant work from the context, and ensure the pap
             "type": type(e).__name__
         }), 500
 
+@paper_generation_bp.route("/generate/stream", methods=["POST"])
+def generate_paper_stream():
+    """Same as /generate but streams the paper as Server-Sent Events"""
+    try:
+        prepared, error_response = prepare_paper_generation(request.json or {})
+        if error_response:
+            return error_response
+    except Exception as e:
+        print(f"Unexpected error in generate_paper_stream: {e}")
+        return jsonify({"error": str(e), "type": type(e).__name__}), 500
+    
+    def events():
+        topic = prepared["topic"]
+        context_used = context_summary(prepared["context"])
+        yield sse_event("start", {"topic": topic, "context_used": context_used})
+        
+        chunks = []
+        try:
+            print("Streaming paper from LLM service...")
+            for text in llm_service.generate_stream(prepared["prompt"], temperature=0.7,
+                                                    use_cache=not prepared["force_regenerate"]):
+                chunks.append(text)
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            yield sse_event("error", llm_error_payload(e))
+            return
+        
+        paper_content = "".join(chunks)
+        if len(paper_content.strip()) < 100:
+            yield sse_event("error", {
+                "error": "Generated paper is too short or empty",
+                "details": "The LLM returned insufficient content. Please try again or check if the model is working properly."
+            })
+            return
+        
+        print(f"Paper streamed successfully, length: {len(paper_content)}")
+        yield sse_event("done", {
+            "topic": topic,
+            "paper": paper_content,
+            "context_used": context_used
+        })
+    
+    return sse_response(events())
+
 @paper_generation_bp.route("/store", methods=["POST"])
 def store_data():
     """Store clusters, synthesis, gaps, and experiments"""
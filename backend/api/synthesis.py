@@ -3,25 +3,72 @@ from flask import Blueprint, jsonify, request
 from collections import Counter, defaultdict
 from services.llm_service import LLMService
 from services.data_cache import DataCache
+from services.single_flight import SingleFlight
+from utils.sse import sse_event, sse_response
+from concurrent.futures import ThreadPoolExecutor, wait
 import json
+import math
+import os
+import queue
 
 synthesis_bp = Blueprint("synthesis", __name__)
 llm_service = LLMService()
 data_cache = DataCache()
+inflight = SingleFlight()  # Concurrent requests for the same corpus share one synthesis run
 
-def generate_synthesis_content(papers):
-    """Generate synthesis content using LLM"""
-    if not papers:
+# Sections are independent, so run as many at once as the LLM backend has parallel slots
+SYNTHESIS_MAX_CONCURRENCY = int(os.getenv("SYNTHESIS_MAX_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "4")))
+SYNTHESIS_SECTION_TIMEOUT = float(os.getenv("SYNTHESIS_SECTION_TIMEOUT", "90"))
+
+NO_PAPERS_SECTIONS = [
+    "methods", "datasets", "metrics", "performance",
+    "method_transitions", "dataset_shifts", "metric_deprecations"
+]
+
+def finalize_section(content, title, default_content):
+    """Clean up LLM output for a section, falling back when it is too short"""
+    if content and len(content.strip()) > 100:  # Require at least 100 chars
+        # Clean up the content
+        content = content.strip()
+        # Ensure it has proper formatting
+        if not content.startswith("**"):
+            # Add bold formatting if missing
+            lines = content.split('\n')
+            if lines[0] and not lines[0].startswith('**'):
+                lines[0] = f"**{lines[0]}**"
+            content = '\n'.join(lines)
+        
+        print(f"Successfully generated {title} ({len(content)} chars)")
         return {
-            "methods": {"content": "No papers available for analysis."},
-            "datasets": {"content": "No papers available for analysis."},
-            "metrics": {"content": "No papers available for analysis."},
-            "performance": {"content": "No papers available for analysis."},
-            "method_transitions": {"content": "No papers available for analysis."},
-            "dataset_shifts": {"content": "No papers available for analysis."},
-            "metric_deprecations": {"content": "No papers available for analysis."}
+            "title": title,
+            "content": content
         }
     
+    print(f"LLM returned short/empty content for {title} (length: {len(content) if content else 0}), using fallback")
+    return {
+        "title": title,
+        "content": default_content
+    }
+
+def safe_generate(prompt, title, default_content, timeout_override=None, use_cache=True):
+    """Safely generate content with fallback and optional timeout"""
+    try:
+        print(f"Generating {title} with LLM...")
+        # Use higher temperature for more creative/detailed content
+        content = llm_service.generate(prompt, temperature=0.6, use_cache=use_cache, timeout=timeout_override)
+        return finalize_section(content, title, default_content)
+    except Exception as e:
+        print(f"Error generating {title} with LLM: {e}")
+        import traceback
+        traceback.print_exc()
+        # Return fallback but mark it
+        return {
+            "title": title,
+            "content": default_content
+        }
+
+def build_synthesis_plan(papers):
+    """Analyze papers and build the prompt and fallback for every synthesis section"""
     # Analyze papers
     methods = Counter()
     datasets = Counter()
@@ -110,46 +157,8 @@ def generate_synthesis_content(papers):
 Key Papers:
 {papers_text}"""
     
-    # Generate only key sections with LLM (reduce from 7 to 2-3 for speed)
-    sections = {}
-    
-    def safe_generate(prompt, title, default_content, timeout_override=None):
-        """Safely generate content with fallback and optional timeout"""
-        try:
-            print(f"Generating {title} with LLM...")
-            # Use higher temperature for more creative/detailed content
-            content = llm_service.generate(prompt, temperature=0.6)
-            if content and len(content.strip()) > 100:  # Require at least 100 chars
-                # Clean up the content
-                content = content.strip()
-                # Ensure it has proper formatting
-                if not content.startswith("**"):
-                    # Add bold formatting if missing
-                    lines = content.split('\n')
-                    if lines[0] and not lines[0].startswith('**'):
-                        lines[0] = f"**{lines[0]}**"
-                    content = '\n'.join(lines)
-                
-                print(f"Successfully generated {title} ({len(content)} chars)")
-                return {
-                    "title": title,
-                    "content": content
-                }
-            else:
-                print(f"LLM returned short/empty content for {title} (length: {len(content) if content else 0}), using fallback")
-                return {
-                    "title": title,
-                    "content": default_content
-                }
-        except Exception as e:
-            print(f"Error generating {title} with LLM: {e}")
-            import traceback
-            traceback.print_exc()
-            # Return fallback but mark it
-            return {
-                "title": title,
-                "content": default_content
-            }
+    # Each section is (key, title, prompt, fallback content); all share the same summary
+    specs = []
     
     # Methods & Approaches - Generate with LLM (key section)
     methods_prompt = f"""You are a research synthesis expert. Analyze the following research papers and write a comprehensive synthesis of the methods and approaches used.
@@ -164,14 +173,15 @@ Write a detailed 3-4 paragraph analysis covering:
 
 Use **bold** for important terms and method names. Be specific and reference the actual research themes from the papers. Write in academic style."""
     
-    sections["methods"] = safe_generate(
-        methods_prompt,
+    specs.append((
+        "methods",
         "Methods & Approaches",
+        methods_prompt,
         f"**Analysis of {len(papers)} papers ({year_range[0] if year_range[0] else '?'}-{year_range[1] if year_range[1] else '?'}):**\n\n"
         f"The dominant methodological approaches include: {', '.join([f'**{m}** ({c} papers)' for m, c in methods.most_common(5)])}. "
         f"These methods represent the primary research directions in this field. "
         f"The distribution shows {methods.most_common(1)[0][0] if methods else 'various methods'} as the most common approach with {methods.most_common(1)[0][1] if methods else 0} papers."
-    )
+    ))
     
     # Datasets & Benchmarks - Generate with LLM
     datasets_prompt = f"""Analyze the datasets and benchmarks used in these research papers:
@@ -186,13 +196,14 @@ Write 2-3 paragraphs on:
 
 Use **bold** for dataset names. Be specific about the evaluation approaches."""
     
-    sections["datasets"] = safe_generate(
-        datasets_prompt,
+    specs.append((
+        "datasets",
         "Datasets & Benchmarks",
+        datasets_prompt,
         f"**Analysis of {len(papers)} papers:**\n\n"
         f"The most commonly used datasets and benchmarks include: {', '.join([f'**{d}** ({c} papers)' for d, c in datasets.most_common(5)]) if datasets else 'Various benchmarks'}. "
         f"{'The field shows a focus on ' + datasets.most_common(1)[0][0] + ' with ' + str(datasets.most_common(1)[0][1]) + ' papers' if datasets else 'Various evaluation approaches are used'}."
-    )
+    ))
     
     # Evaluation Metrics - Generate with LLM
     metrics_prompt = f"""Analyze the evaluation metrics used in these research papers:
@@ -207,13 +218,14 @@ Write 2-3 paragraphs on:
 
 Use **bold** for metric names. Explain the importance of these metrics."""
     
-    sections["metrics"] = safe_generate(
-        metrics_prompt,
+    specs.append((
+        "metrics",
         "Evaluation Metrics",
+        metrics_prompt,
         f"**Common evaluation metrics:**\n\n"
         f"The primary metrics used across these papers include: {', '.join([f'**{m}** ({c} papers)' for m, c in metrics.most_common(5)]) if metrics else 'Various metrics'}. "
         f"{metrics.most_common(1)[0][0] + ' appears in ' + str(metrics.most_common(1)[0][1]) + ' papers' if metrics else 'Various evaluation approaches'}."
-    )
+    ))
     
     # Performance Trends - Generate with LLM
     performance_prompt = f"""Analyze performance trends and research progress in these papers:
@@ -228,14 +240,15 @@ Write 2-3 paragraphs on:
 
 Use **bold** for important concepts. Be analytical about the research trajectory."""
     
-    sections["performance"] = safe_generate(
-        performance_prompt,
+    specs.append((
+        "performance",
         "Performance Trends",
+        performance_prompt,
         f"**Performance analysis ({year_range[0] if year_range[0] else '?'}-{year_range[1] if year_range[1] else '?'}):**\n\n"
         f"Analysis of {len(papers)} papers reveals performance trends across the field. "
         f"The research spans {year_range[1] - year_range[0] + 1 if year_range[0] and year_range[1] else 'multiple'} years, "
         f"showing evolution in performance standards and evaluation approaches."
-    )
+    ))
     
     # Method Transitions (Evolution) - Generate with LLM (key section)
     transitions_prompt = f"""Analyze the evolution and paradigm shifts in this research field:
@@ -250,14 +263,15 @@ Write a detailed 3-4 paragraph analysis covering:
 
 Use **bold** for important concepts. Be insightful about the field's evolution."""
     
-    sections["method_transitions"] = safe_generate(
-        transitions_prompt,
+    specs.append((
+        "method_transitions",
         "Method Transitions",
+        transitions_prompt,
         f"**Field Evolution Analysis:**\n\n"
         f"Based on {len(papers)} papers from {year_range[0] if year_range[0] else '?'} to {year_range[1] if year_range[1] else '?'}, "
         f"the field has evolved with key methods including: {', '.join([m for m, _ in methods.most_common(3)]) if methods else 'various approaches'}. "
         f"Research directions show different trajectories, with some methods gaining prominence while others stabilize or decline."
-    )
+    ))
     
     # Dataset Shifts (Evolution) - Generate with LLM
     dataset_shifts_prompt = f"""Analyze how dataset and benchmark usage has evolved:
@@ -272,13 +286,14 @@ Write 2-3 paragraphs on:
 
 Use **bold** for dataset names. Explain the significance of these shifts."""
     
-    sections["dataset_shifts"] = safe_generate(
-        dataset_shifts_prompt,
+    specs.append((
+        "dataset_shifts",
         "Dataset Shifts",
+        dataset_shifts_prompt,
         f"**Benchmark Evolution ({year_range[0] if year_range[0] else '?'}-{year_range[1] if year_range[1] else '?'}):**\n\n"
         f"Dataset usage has evolved over time. Top datasets include: {', '.join([d for d, _ in datasets.most_common(3)]) if datasets else 'Various benchmarks'}. "
         f"The field shows {datasets.most_common(1)[0][0] + ' as the dominant benchmark' if datasets else 'diverse evaluation approaches'}."
-    )
+    ))
     
     # Metric Deprecations (Evolution) - Generate with LLM
     metric_evolution_prompt = f"""Analyze how evaluation metrics have evolved:
@@ -293,16 +308,17 @@ Write 2-3 paragraphs on:
 
 Use **bold** for metric names. Explain the significance of these changes."""
     
-    sections["metric_deprecations"] = safe_generate(
-        metric_evolution_prompt,
+    specs.append((
+        "metric_deprecations",
         "Metric Evolution",
+        metric_evolution_prompt,
         f"**Metric Evolution:**\n\n"
         f"Evaluation metrics have evolved, with common metrics including: {', '.join([m for m, _ in metrics.most_common(3)]) if metrics else 'Various metrics'}. "
         f"The field shows {metrics.most_common(1)[0][0] + ' as a primary metric' if metrics else 'diverse evaluation approaches'}."
-    )
+    ))
     
     return {
-        "sections": sections,
+        "specs": specs,
         "statistics": {
             "papers_analyzed": len(papers),
             "year_range": {"start": year_range[0], "end": year_range[1]},
@@ -312,49 +328,164 @@ Use **bold** for metric names. Explain the significance of these changes."""
         }
     }
 
+def generate_synthesis_content(papers, use_cache=True):
+    """Generate synthesis content using LLM (use_cache=False forces fresh LLM output)"""
+    if not papers:
+        return {key: {"content": "No papers available for analysis."} for key in NO_PAPERS_SECTIONS}
+    
+    plan = build_synthesis_plan(papers)
+    specs = plan["specs"]
+    workers = max(1, min(SYNTHESIS_MAX_CONCURRENCY, len(specs)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="synthesis")
+    futures = [
+        executor.submit(safe_generate, prompt, title, default_content, SYNTHESIS_SECTION_TIMEOUT, use_cache)
+        for _, title, prompt, default_content in specs
+    ]
+    # Sections beyond the concurrency limit queue behind earlier ones, so allow one timeout per wave
+    deadline = SYNTHESIS_SECTION_TIMEOUT * math.ceil(len(specs) / workers) + 5
+    wait(futures, timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    sections = {}
+    for (key, title, _, default_content), future in zip(specs, futures):
+        if future.done() and not future.cancelled():
+            sections[key] = future.result()
+        else:
+            print(f"Timed out generating {title}, using fallback")
+            sections[key] = {"title": title, "content": default_content}
+    
+    return {
+        "sections": sections,
+        "statistics": plan["statistics"]
+    }
+
+def stream_sections(specs, use_cache=True):
+    """Stream all sections concurrently, yielding (event, payload) pairs as tokens arrive"""
+    events = queue.Queue()
+    
+    def run(key, title, prompt, default_content):
+        events.put(("section_start", {"key": key, "title": title}))
+        chunks = []
+        try:
+            print(f"Streaming {title} with LLM...")
+            for text in llm_service.generate_stream(prompt, temperature=0.6, use_cache=use_cache):
+                chunks.append(text)
+                events.put(("token", {"key": key, "text": text}))
+            section = finalize_section("".join(chunks), title, default_content)
+        except Exception as e:
+            print(f"Error streaming {title} with LLM: {e}")
+            section = {"title": title, "content": default_content}
+        events.put(("section_end", {"key": key, **section}))
+    
+    workers = max(1, min(SYNTHESIS_MAX_CONCURRENCY, len(specs)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="synthesis-stream")
+    for spec in specs:
+        executor.submit(run, *spec)
+    executor.shutdown(wait=False)
+    
+    pending = {key: (title, default_content) for key, title, _, default_content in specs}
+    while pending:
+        try:
+            event, payload = events.get(timeout=SYNTHESIS_SECTION_TIMEOUT)
+        except queue.Empty:
+            # No progress from any section for a full timeout: close out the rest with fallbacks
+            for key, (title, default_content) in pending.items():
+                print(f"Timed out streaming {title}, using fallback")
+                yield "section_end", {"key": key, "title": title, "content": default_content}
+            return
+        if event == "section_end":
+            pending.pop(payload["key"], None)
+        yield event, payload
+
+def flag_missing_llm(result):
+    """Attach a warning when every section fell back to keyword analysis"""
+    # Check if LLM was actually used (not just fallback content)
+    llm_used = False
+    for section_key, section_data in result.get("sections", {}).items():
+        content = section_data.get("content", "")
+        # Check if content looks like LLM-generated (longer, more detailed)
+        if len(content) > 200 and ("**" in content or "\n\n" in content):
+            llm_used = True
+            break
+    
+    if not llm_used:
+        result["warning"] = "LLM generation failed or returned insufficient content. Using basic analysis. Please ensure Ollama is running and the model is available for full synthesis."
+        print("Warning: Synthesis generated without LLM - using fallback content")
+    return result
+
+def parse_synthesis_request(data):
+    """Accept either a bare list of papers or {"papers": [...], "force_regenerate": bool}"""
+    if isinstance(data, list):
+        # Backward compatibility: if data is a list, treat as papers
+        return data, False
+    # New format: data is a dict with papers and optional force_regenerate
+    data = data or {}
+    return data.get("papers", []), data.get("force_regenerate", False)
+
+def get_or_build_synthesis(papers, force_regenerate=False):
+    """Return cached synthesis for the papers, generating and caching it on a miss"""
+    # Check cache first (unless force_regenerate is True)
+    if not force_regenerate:
+        cached_data = data_cache.get_synthesis(papers)
+        if cached_data and cached_data.get("synthesis"):
+            print("Returning cached synthesis")
+            return cached_data["synthesis"]
+    
+    # Generate fresh synthesis
+    print("Generating fresh synthesis content...")
+    result = flag_missing_llm(generate_synthesis_content(papers, use_cache=not force_regenerate))
+    
+    # Auto-store in cache
+    data_cache.save_synthesis(papers, result)
+    return result
+
 @synthesis_bp.route("/", methods=["POST"])
 def synthesis():
     try:
-        data = request.json
-        if isinstance(data, list):
-            # Backward compatibility: if data is a list, treat as papers
-            papers = data
-            force_regenerate = False
-        else:
-            # New format: data is a dict with papers and optional force_regenerate
-            papers = data.get("papers", [])
-            force_regenerate = data.get("force_regenerate", False)
+        papers, force_regenerate = parse_synthesis_request(request.json)
         
         if not papers:
             return jsonify({"error": "No papers provided"}), 400
         
-        # Check cache first (unless force_regenerate is True)
-        if not force_regenerate:
-            cached_data = data_cache.get_synthesis(papers)
-            if cached_data and cached_data.get("synthesis"):
-                print("Returning cached synthesis")
-                return jsonify(cached_data["synthesis"])
-        
-        # Generate fresh synthesis
-        print("Generating fresh synthesis content...")
-        result = generate_synthesis_content(papers)
-        
-        # Check if LLM was actually used (not just fallback content)
-        llm_used = False
-        for section_key, section_data in result.get("sections", {}).items():
-            content = section_data.get("content", "")
-            # Check if content looks like LLM-generated (longer, more detailed)
-            if len(content) > 200 and ("**" in content or "\n\n" in content):
-                llm_used = True
-                break
-        
-        if not llm_used:
-            result["warning"] = "LLM generation failed or returned insufficient content. Using basic analysis. Please ensure Ollama is running and the model is available for full synthesis."
-            print("Warning: Synthesis generated without LLM - using fallback content")
-        
-        # Auto-store in cache
-        data_cache.save_synthesis(papers, result)
-        
+        key = f"synthesis_{data_cache.fingerprint(papers)}" + ("_force" if force_regenerate else "")
+        result = inflight.do(key, get_or_build_synthesis, papers, force_regenerate)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@synthesis_bp.route("/stream", methods=["POST"])
+def synthesis_stream():
+    """Same as / but streams tokens and section boundaries as Server-Sent Events"""
+    papers, force_regenerate = parse_synthesis_request(request.json)
+    if not papers:
+        return jsonify({"error": "No papers provided"}), 400
+    
+    def events():
+        try:
+            if not force_regenerate:
+                cached_data = data_cache.get_synthesis(papers)
+                if cached_data and cached_data.get("synthesis"):
+                    print("Returning cached synthesis (stream)")
+                    yield sse_event("done", {"cached": True, "synthesis": cached_data["synthesis"]})
+                    return
+            
+            plan = build_synthesis_plan(papers)
+            yield sse_event("start", {
+                "sections": [key for key, _, _, _ in plan["specs"]],
+                "statistics": plan["statistics"]
+            })
+            
+            sections = {}
+            for event, payload in stream_sections(plan["specs"], use_cache=not force_regenerate):
+                if event == "section_end":
+                    sections[payload["key"]] = {"title": payload["title"], "content": payload["content"]}
+                yield sse_event(event, payload)
+            
+            result = flag_missing_llm({"sections": sections, "statistics": plan["statistics"]})
+            data_cache.save_synthesis(papers, result)
+            yield sse_event("done", {"cached": False, "synthesis": result})
+        except Exception as e:
+            print(f"Error in synthesis stream: {e}")
+            yield sse_event("error", {"error": str(e)})
+    
+    return sse_response(events())
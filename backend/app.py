@@ -8,6 +8,8 @@ from api.gaps import gaps_bp
 from api.experiments import experiments_bp
 from api.code import code_bp
 from api.paper_generation import paper_generation_bp
+from api.agents import agents_bp
+from services.llm_service import LLMService, get_pool_stats
 
 def create_app():
     app = Flask(__name__)
@@ -15,7 +17,12 @@ def create_app():
     
     @app.route("/api/health", methods=["GET"])
     def health():
-        return jsonify({"status": "ok", "message": "Backend is running on port 5005"})
+        return jsonify({
+            "status": "ok",
+            "message": "Backend is running on port 5005",
+            "llm_pool": get_pool_stats(),
+            "llm_cache": LLMService.cache_stats()
+        })
     
     app.register_blueprint(discover_bp, url_prefix="/api/discover")
     app.register_blueprint(clusters_bp, url_prefix="/api/clusters")
@@ -24,6 +31,7 @@ def create_app():
     app.register_blueprint(experiments_bp, url_prefix="/api/experiments")
     app.register_blueprint(code_bp, url_prefix="/api/code")
     app.register_blueprint(paper_generation_bp, url_prefix="/api/paper")
+    app.register_blueprint(agents_bp, url_prefix="/api/agents")
     return app
 
 if __name__ == "__main__":
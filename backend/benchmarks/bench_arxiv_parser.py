@@ -0,0 +1,114 @@
+# benchmarks/bench_arxiv_parser.py
+"""
+Compare the streaming Atom parser with feedparser on synthetic arXiv feeds.
+
+Run from the backend directory:
+    python -m benchmarks.bench_arxiv_parser [--entries 2000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+import feedparser
+
+from benchmarks.bench_object_store import WORDS
+from services.arxiv_atom import parse_feed
+
+def synthetic_feed(n, seed=0):
+    """Atom feed shaped like an arXiv API response, with the extra elements real entries carry"""
+    rng = random.Random(seed)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+        '  <link href="http://arxiv.org/api/query" rel="self" type="application/atom+xml"/>\n'
+        "  <title type=\"html\">ArXiv Query: search_query=all:bench</title>\n"
+        f"  <opensearch:totalResults>{n * 10}</opensearch:totalResults>\n"
+        "  <opensearch:startIndex>0</opensearch:startIndex>\n"
+        f"  <opensearch:itemsPerPage>{n}</opensearch:itemsPerPage>\n"
+    ]
+    for i in range(n):
+        year = rng.randint(2015, 2025)
+        paper_id = f"{year % 100:02d}{rng.randint(1, 12):02d}.{i:05d}"
+        title = " ".join(rng.choice(WORDS) for _ in range(12)).title()
+        abstract = " ".join(rng.choice(WORDS) for _ in range(200))
+        authors = "".join(
+            f"    <author>\n      <name>Author {rng.randint(1, 5000)}</name>\n"
+            f"      <arxiv:affiliation>University {rng.randint(1, 300)}</arxiv:affiliation>\n    </author>\n"
+            for _ in range(rng.randint(1, 8))
+        )
+        parts.append(
+            "  <entry>\n"
+            f"    <id>http://arxiv.org/abs/{paper_id}v{rng.randint(1, 3)}</id>\n"
+            f"    <updated>{year}-07-02T12:00:00Z</updated>\n"
+            f"    <published>{year}-06-01T09:30:00Z</published>\n"
+            f"    <title>{escape(title[:60])}\n  {escape(title[60:])}</title>\n"
+            f"    <summary>  {escape(abstract[:400])}\n{escape(abstract[400:])}\n</summary>\n"
+            f"{authors}"
+            f"    <arxiv:comment>{rng.randint(5, 40)} pages, {rng.randint(1, 12)} figures</arxiv:comment>\n"
+            f'    <link href="http://arxiv.org/abs/{paper_id}v1" rel="alternate" type="text/html"/>\n'
+            f'    <link title="pdf" href="http://arxiv.org/pdf/{paper_id}v1" rel="related" type="application/pdf"/>\n'
+            '    <arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>\n'
+            '    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>\n'
+            '    <category term="stat.ML" scheme="http://arxiv.org/schemas/atom"/>\n'
+            "  </entry>\n"
+        )
+    parts.append("</feed>\n")
+    return "".join(parts).encode("utf-8")
+
+def parse_with_feedparser(content):
+    """What the fetch paths did before: feedparser, then copy the fields out"""
+    feed = feedparser.parse(content)
+    papers = []
+    for entry in feed.entries:
+        published = entry.get("published", "")
+        if not published:
+            continue
+        papers.append({
+            "paper_id": entry.get("id", ""),
+            "title": entry.get("title", "Untitled").replace("\n", " ").strip(),
+            "abstract": entry.get("summary", "").replace("\n", " ").strip(),
+            "authors": [a.name for a in entry.get("authors", [])],
+            "year": int(published[:4]),
+            "venue": "arXiv",
+            "url": entry.get("link", "")
+        })
+    return papers
+
+def parse_with_atom(content):
+    return parse_feed(content)[0]
+
+def measure(parse, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        papers = parse(content)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return papers, min(timings), peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    content = synthetic_feed(args.entries)
+    print(f"feed: {args.entries} entries, {len(content):,} bytes")
+    print(f"{'parser':<12} {'parse ms':>10} {'peak MiB':>10}")
+    results = {}
+    for name, parse in (("feedparser", parse_with_feedparser), ("arxiv_atom", parse_with_atom)):
+        papers, elapsed, peak = measure(parse, content, args.repeat)
+        results[name] = papers
+        print(f"{name:<12} {elapsed * 1000:>10.1f} {peak / 2 ** 20:>10.1f}")
+
+    mismatches = sum(a != b for a, b in zip(results["feedparser"], results["arxiv_atom"]))
+    print(f"records: {len(results['arxiv_atom'])}, mismatches vs feedparser: {mismatches}")
+
+if __name__ == "__main__":
+    main()
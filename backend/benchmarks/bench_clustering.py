@@ -0,0 +1,80 @@
+# benchmarks/bench_clustering.py
+"""
+Compare clustering algorithms on synthetic abstracts drawn from planted topics.
+
+Quality is the adjusted Rand index against the planted topic of each paper.
+
+Run from the backend directory:
+    python -m benchmarks.bench_clustering [--sizes 1000 10000 100000] [--algorithms kmeans minibatch] [--auto-k] [--lsa]
+
+--auto-k lets the service choose k by its parallel silhouette sweep instead of
+passing the planted topic count. --lsa also runs every algorithm on the LSA-reduced
+matrix; the SVD is fitted on the first run per size and reused after that.
+"""
+import argparse
+import random
+import time
+
+from sklearn.metrics import adjusted_rand_score
+
+from services.clustering_service import ClusteringService
+
+def synthetic_abstracts(n, topics=8, seed=0):
+    """n papers whose abstracts mix a topic-specific vocabulary with shared filler words"""
+    rng = random.Random(seed)
+    word = lambda: "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+    shared = [word() for _ in range(2000)]
+    topic_vocab = [[word() for _ in range(100)] for _ in range(topics)]
+    papers, truth = [], []
+    for i in range(n):
+        topic = rng.randrange(topics)
+        words = [rng.choice(topic_vocab[topic]) if rng.random() < 0.4 else rng.choice(shared) for _ in range(150)]
+        papers.append({
+            "paper_id": f"http://arxiv.org/abs/2301.{i:06d}v1",
+            "title": " ".join(words[:8]).title(),
+            "abstract": " ".join(words),
+            "authors": [f"Author {rng.randint(1, 5000)}"],
+            "year": rng.randint(2015, 2025)
+        })
+        truth.append(topic)
+    return papers, truth
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--algorithms", nargs="+", default=["kmeans", "minibatch"])
+    parser.add_argument("--topics", type=int, default=8)
+    parser.add_argument("--kmeans-max", type=int, default=100000,
+                        help="skip full-batch KMeans above this many papers")
+    parser.add_argument("--auto-k", action="store_true", help="let the service select k")
+    parser.add_argument("--lsa", action="store_true", help="also run each algorithm with LSA reduction")
+    args = parser.parse_args()
+
+    service = ClusteringService()
+    print(f"{'papers':>7} {'algorithm':>14} {'k':>3} {'vectorize':>10} {'lsa':>6} {'select_k':>9} {'fit':>8} "
+          f"{'summarize':>10} {'total':>8} {'ARI':>6}")
+    for n in args.sizes:
+        papers, truth = synthetic_abstracts(n, args.topics)
+        runs = [(algorithm, lsa) for algorithm in args.algorithms for lsa in ((False, True) if args.lsa else (False,))]
+        for algorithm, lsa in runs:
+            label = f"{algorithm}+lsa" if lsa else algorithm
+            if algorithm == "kmeans" and n > args.kmeans_max:
+                print(f"{n:>7} {label:>14} {'skipped':>10}")
+                continue
+            start = time.perf_counter()
+            clusters, metadata = service.cluster_papers(papers, k=None if args.auto_k else args.topics,
+                                                        algorithm=algorithm, lsa=lsa)
+            elapsed = time.perf_counter() - start
+
+            labels = {}
+            for cluster in clusters:
+                for paper in cluster["papers"]:
+                    labels[paper["paper_id"]] = cluster["cluster_id"]
+            ari = adjusted_rand_score(truth, [labels[p["paper_id"]] for p in papers])
+            timings = metadata["timings"]
+            print(f"{n:>7} {label:>14} {metadata['k']:>3} {timings['vectorize']:>10.2f} "
+                  f"{timings.get('lsa', 0):>6.2f} {timings.get('select_k', 0):>9.2f} {timings['fit']:>8.2f} "
+                  f"{timings['summarize']:>10.2f} {elapsed:>8.2f} {ari:>6.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_corpus_store.py
+"""
+Measure local discovery from the corpus store (no network needed).
+
+Run from the backend directory:
+    python -m benchmarks.bench_corpus_store [--sizes 10000 50000] [--max-results 50] [--repeat 20]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_object_store import synthetic_papers
+from storage.corpus_store import CorpusStore
+
+QUERIES = ["quantum circuit", "robust diffusion", "graph learning", "adversarial benchmark dataset"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--max-results", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'papers':>7}  {'insert s':>9} {'search ms':>10} {'hits':>6} {'db bytes':>13}")
+    for n in args.sizes:
+        base = tempfile.mkdtemp(prefix="bench_corpus_")
+        try:
+            store = CorpusStore(db_path=os.path.join(base, "corpus.db"))
+            papers = synthetic_papers(n)
+            start = time.perf_counter()
+            for i in range(0, n, 500):
+                store.add_papers(papers[i:i + 500])
+            insert = time.perf_counter() - start
+
+            timings = []
+            hits = 0
+            for _ in range(args.repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    hits = len(store.search(query, 2015, 2025, args.max_results))
+                    timings.append(time.perf_counter() - start)
+            timings.sort()
+            median = timings[len(timings) // 2]
+            size = os.path.getsize(store.db_path)
+            print(f"{n:>7}  {insert:>9.2f} {median * 1000:>10.2f} {hits:>6} {size:>13,}")
+        finally:
+            shutil.rmtree(base, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_dedup.py
+"""
+Measure near-duplicate detection on synthetic corpora with planted duplicates.
+
+Run from the backend directory:
+    python -m benchmarks.bench_dedup [--sizes 5000 20000 50000] [--duplicates 0.05]
+"""
+import argparse
+import random
+import time
+
+from services.dedup_service import DedupService
+
+def synthetic_corpus(n, duplicate_ratio, seed=0):
+    """n distinct papers plus, for a sample of them, a new arXiv version and an edited journal copy"""
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(8000)]
+    papers = [{
+        "paper_id": f"http://arxiv.org/abs/{2100 + i // 100000}.{i % 100000:05d}v1",
+        "title": " ".join(rng.choice(vocab) for _ in range(10)),
+        "abstract": " ".join(rng.choice(vocab) for _ in range(180))
+    } for i in range(n)]
+
+    planted = 0
+    for paper in rng.sample(papers, int(n * duplicate_ratio)):
+        words = paper["abstract"].split()
+        for _ in range(8):
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+        papers.append({**paper, "paper_id": paper["paper_id"][:-2] + "v2"})
+        papers.append({
+            "paper_id": f"doi:10.0000/{rng.randint(0, 10 ** 9)}",
+            "title": paper["title"] + " journal version",
+            "abstract": " ".join(words)
+        })
+        planted += 2
+    rng.shuffle(papers)
+    return papers, planted
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 50000])
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'papers':>7} {'planted':>8} {'found':>7} {'seconds':>8} {'us/paper':>9}")
+    for n in args.sizes:
+        papers, planted = synthetic_corpus(n, args.duplicates)
+        service = DedupService("flag")
+        start = time.perf_counter()
+        service.process(papers)
+        elapsed = time.perf_counter() - start
+        print(f"{len(papers):>7} {planted:>8} {service.stats['duplicates']:>7} {elapsed:>8.2f} "
+              f"{elapsed / len(papers) * 1e6:>9.0f}")
+
+if __name__ == "__main__":
+    main()
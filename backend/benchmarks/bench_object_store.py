@@ -0,0 +1,101 @@
+# benchmarks/bench_object_store.py
+"""
+Compare ObjectStore codecs on synthetic cluster results.
+
+Run from the backend directory:
+    python -m benchmarks.bench_object_store [--sizes 1000 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from storage.codecs import CODECS
+from storage.object_store import ObjectStore
+
+WORDS = ("quantum transformer robust diffusion benchmark circuit adversarial dataset "
+         "accuracy fidelity learning network model training evaluation graph").split()
+
+def synthetic_papers(n, seed=0):
+    rng = random.Random(seed)
+    papers = []
+    for i in range(n):
+        year = rng.randint(2015, 2025)
+        papers.append({
+            "paper_id": f"http://arxiv.org/abs/{year % 100:02d}{rng.randint(1, 12):02d}.{i:05d}v{rng.randint(1, 3)}",
+            "title": " ".join(rng.choice(WORDS) for _ in range(10)).title(),
+            "abstract": " ".join(rng.choice(WORDS) for _ in range(180)),
+            "authors": [f"Author {rng.randint(1, 5000)}" for _ in range(rng.randint(1, 6))],
+            "year": year,
+            "venue": "arXiv",
+            "url": f"http://arxiv.org/abs/{i}"
+        })
+    return papers
+
+def synthetic_cluster_result(papers, k=8):
+    """Same shape as cluster_papers() output: every member paper embedded per cluster"""
+    clusters = [[] for _ in range(k)]
+    for i, paper in enumerate(papers):
+        clusters[i % k].append(paper)
+    return [{
+        "cluster_id": str(cid),
+        "name": f"Cluster {cid}",
+        "paper_count": len(members),
+        "trajectory": "Stable",
+        "papers": members,
+        "key_papers": [p["title"] for p in members[:3]],
+        "avg_year": sum(p["year"] for p in members) / len(members),
+        "year_distribution": dict(Counter(p["year"] for p in members))
+    } for cid, members in enumerate(clusters)]
+
+def bench(codec_name, payload, repeat):
+    base = tempfile.mkdtemp(prefix="bench_store_")
+    try:
+        store = ObjectStore(base_path=base, codec=codec_name)
+        save_times, load_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path = store.save_json("clusters_bench", payload)
+            save_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            store.load_json("clusters_bench")
+            load_times.append(time.perf_counter() - start)
+        return min(save_times), min(load_times), os.path.getsize(path)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'papers':>7}  {'codec':<14} {'save ms':>9} {'load ms':>9} {'bytes':>12}")
+    for n in args.sizes:
+        payload = {"clusters": synthetic_cluster_result(synthetic_papers(n))}
+        # Baseline: what ObjectStore wrote before codecs existed (pretty-printed JSON)
+        base = tempfile.mkdtemp(prefix="bench_store_")
+        try:
+            path = os.path.join(base, "legacy.json")
+            start = time.perf_counter()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2)
+            save = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(path, "r", encoding="utf-8") as f:
+                json.load(f)
+            load = time.perf_counter() - start
+            print(f"{n:>7}  {'json indent=2':<14} {save * 1000:>9.1f} {load * 1000:>9.1f} {os.path.getsize(path):>12,}")
+        finally:
+            shutil.rmtree(base, ignore_errors=True)
+
+        for codec_name in CODECS:
+            save, load, size = bench(codec_name, payload, args.repeat)
+            print(f"{n:>7}  {codec_name:<14} {save * 1000:>9.1f} {load * 1000:>9.1f} {size:>12,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# dev/stub_upstream.py
+"""
+Local stand-in for the arXiv and Semantic Scholar APIs, for offline testing.
+
+Run from the backend directory:
+    python -m dev.stub_upstream [--port 8099] [--papers 2000] [--delay 0.0]
+
+Then point the backend at it:
+    ARXIV_API=http://localhost:8099/api/query
+    SEMANTIC_SCHOLAR_API=http://localhost:8099/graph/v1/paper
+
+Responses are deterministic and carry ETag/Last-Modified headers; conditional
+requests get 304. GET /__down makes every API call return 503 (to exercise
+stale-if-error) until GET /__up.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+WORDS = ("quantum transformer robust diffusion benchmark circuit adversarial dataset "
+         "accuracy fidelity learning network model training evaluation graph").split()
+# Pseudo-words so every stub abstract is distinct text (keeps near-duplicate detection honest)
+VOCABULARY = [f"{WORDS[n % len(WORDS)]}{n}" for n in range(2000)]
+DATE_RANGE_RE = re.compile(r"submittedDate:\[(\d{4})\d*\s+TO\s+(\d{4})\d*\]")
+
+def stub_id(i, year):
+    return f"{year % 100:02d}{i % 12 + 1:02d}.{i:05d}"
+
+class StubState:
+    def __init__(self, papers, delay):
+        self.papers = papers
+        self.delay = delay
+        self.down = False
+        self.started = formatdate(time.time(), usegmt=True)
+        self.requests = 0
+
+    def corpus(self, search_query):
+        """Deterministic entries matching search_query, honouring a submittedDate range"""
+        match = DATE_RANGE_RE.search(search_query)
+        low, high = (int(match.group(1)), int(match.group(2))) if match else (0, 9999)
+        terms = re.sub(r'[()"]|\bAND\b|all:', " ", DATE_RANGE_RE.sub("", search_query)).split()
+        topic = " ".join(terms) or "research"
+        entries = []
+        for i in range(self.papers):
+            year = 2010 + i % 16
+            if low <= year <= high:
+                entries.append((i, year, topic))
+        return entries
+
+def atom_feed(entries, start, total, page_size):
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">',
+        "<title>ArXiv Query</title>",
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>",
+        f"<opensearch:startIndex>{start}</opensearch:startIndex>",
+        f"<opensearch:itemsPerPage>{page_size}</opensearch:itemsPerPage>"
+    ]
+    for i, year, topic in entries:
+        paper_id = stub_id(i, year)
+        rng = random.Random(i)
+        words = " ".join(rng.choice(WORDS + VOCABULARY) for _ in range(60))
+        parts.append(
+            f"<entry><id>http://arxiv.org/abs/{paper_id}v1</id>"
+            f"<updated>{year}-06-01T00:00:00Z</updated><published>{year}-06-01T00:00:00Z</published>"
+            f"<title>{escape(topic.title())} study {i}:\n {WORDS[i % len(WORDS)]} methods</title>"
+            f"<summary>We study {escape(topic)} using {words}.</summary>"
+            f"<author><name>Author {i % 97}</name></author><author><name>Author {(i * 7) % 101}</name></author>"
+            f'<link href="http://arxiv.org/abs/{paper_id}v1" rel="alternate" type="text/html"/>'
+            f'<arxiv:primary_category term="cs.LG"/></entry>'
+        )
+    parts.append("</feed>")
+    return "".join(parts).encode("utf-8")
+
+def s2_record(raw_id):
+    """Semantic Scholar-shaped citation record derived from the id"""
+    digest = int(hashlib.md5(raw_id.encode("utf-8")).hexdigest(), 16)
+    return {
+        "paperId": f"{digest:040x}"[:40],
+        "externalIds": {"ArXiv": raw_id.split(":")[-1]},
+        "citationCount": digest % 500,
+        "referenceCount": digest % 60,
+        "year": 2010 + digest % 16
+    }
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="application/json", cacheable=False):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if cacheable:
+                self.send_header("ETag", f'"{hashlib.md5(body).hexdigest()}"')
+                self.send_header("Last-Modified", state.started)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_cacheable(self, body, content_type):
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(200, body, content_type, cacheable=True)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path in ("/__down", "/__up"):
+                state.down = url.path == "/__down"
+                return self._send(200, json.dumps({"down": state.down}).encode("utf-8"))
+
+            state.requests += 1
+            if state.down:
+                return self._send(503, b'{"error": "stub is down"}')
+            time.sleep(state.delay)
+
+            query = parse_qs(url.query)
+            if url.path == "/api/query":
+                entries = state.corpus(query.get("search_query", [""])[0])
+                start = int(query.get("start", ["0"])[0])
+                page_size = int(query.get("max_results", ["10"])[0])
+                body = atom_feed(entries[start:start + page_size], start, len(entries), page_size)
+                return self._send_cacheable(body, "application/atom+xml")
+
+            if url.path.startswith("/graph/v1/paper/"):
+                raw_id = url.path[len("/graph/v1/paper/"):]
+                return self._send_cacheable(json.dumps(s2_record(raw_id)).encode("utf-8"), "application/json")
+
+            self._send(404, b'{"error": "not found"}')
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            # Always drain the body so the keep-alive connection stays in sync
+            length = int(self.headers.get("Content-Length", "0"))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            state.requests += 1
+            if state.down:
+                return self._send(503, b'{"error": "stub is down"}')
+            time.sleep(state.delay)
+
+            if url.path == "/graph/v1/paper/batch":
+                ids = payload.get("ids", [])
+                if len(ids) > 500:
+                    return self._send(400, b'{"error": "at most 500 ids per request"}')
+                records = [s2_record(raw_id) for raw_id in ids]
+                return self._send(200, json.dumps(records).encode("utf-8"))
+
+            self._send(404, b'{"error": "not found"}')
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--papers", type=int, default=2000, help="entries per query before the year filter")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to sleep per request")
+    args = parser.parse_args()
+
+    state = StubState(args.papers, args.delay)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"Stub upstream listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
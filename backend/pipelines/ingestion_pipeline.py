@@ -1,11 +1,13 @@
 # pipelines/ingestion_pipeline.py
 from agents.discovery_agent import DiscoveryAgent
 from agents.extraction_agent import ExtractionAgent
+from services.dedup_service import DedupService
 
 class IngestionPipeline:
     def __init__(self):
         self.discovery_agent = DiscoveryAgent()
         self.extraction_agent = ExtractionAgent()
+        self.dedup_service = DedupService()
 
     def run(self, query, start_year=2015, end_year=None, max_results=50):
         papers = self.discovery_agent.fetch_papers(
@@ -15,6 +17,9 @@ class IngestionPipeline:
             max_results=max_results
         )
 
+        # Merge near-duplicates before they inflate extraction and clustering
+        papers = self.dedup_service.deduplicate(papers)
+
         extracted_papers = self.extraction_agent.extract_entities(papers)
 
         return extracted_papers
@@ -0,0 +1,82 @@
+# services/arxiv_atom.py
+import io
+import xml.etree.ElementTree as ET
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    return (child.text or "") if child is not None else ""
+
+def entry_to_paper(entry):
+    """Build a paper dict from an <entry> element, or None if it has no usable date"""
+    published = _text(entry, f"{ATOM}published").strip()
+    if not published:
+        return None
+
+    url = ""
+    for link in entry.iter(f"{ATOM}link"):
+        if link.get("rel", "alternate") == "alternate":
+            url = link.get("href", "")
+            break
+
+    return {
+        "paper_id": _text(entry, f"{ATOM}id").strip(),
+        "title": (_text(entry, f"{ATOM}title") or "Untitled").replace("\n", " ").strip(),
+        "abstract": _text(entry, f"{ATOM}summary").replace("\n", " ").strip(),
+        "authors": [_text(author, f"{ATOM}name").strip() for author in entry.iter(f"{ATOM}author")],
+        "year": int(published[:4]),
+        "venue": "arXiv",
+        "url": url
+    }
+
+def iter_feed(source, meta=None):
+    """Yield paper dicts from an arXiv Atom feed as each </entry> is parsed.
+
+    source is bytes or a binary file object. Finished entries are cleared from
+    the tree, so memory stays flat regardless of feed size. meta, if given, is
+    filled with "total_results" and "entries" (entries seen, including skipped ones).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if meta is None:
+        meta = {}
+    meta.update({"total_results": None, "entries": 0})
+
+    root = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == f"{ATOM}entry":
+            meta["entries"] += 1
+            try:
+                paper = entry_to_paper(elem)
+            except (ValueError, TypeError) as e:
+                print(f"Warning: Skipping entry due to error: {e}")
+                paper = None
+            # Drop the finished entry (and anything before it) from the tree
+            root.clear()
+            if paper is not None:
+                yield paper
+        elif elem.tag == f"{OPENSEARCH}totalResults":
+            meta["total_results"] = int(elem.text) if elem.text and elem.text.strip().isdigit() else None
+
+def parse_feed(source):
+    """Parse a whole feed; returns (papers, entries_seen, total_results).
+
+    A malformed feed raises unless some entries were already recovered, in
+    which case they are returned with a warning (truncated responses).
+    """
+    meta = {}
+    papers = []
+    try:
+        for paper in iter_feed(source, meta):
+            papers.append(paper)
+    except ET.ParseError as e:
+        if not meta.get("entries"):
+            raise Exception(f"Feed parsing error: {e}")
+        print(f"Warning: feed truncated after {meta['entries']} entries: {e}")
+    return papers, meta["entries"], meta["total_results"]
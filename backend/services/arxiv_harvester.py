@@ -0,0 +1,156 @@
+# services/arxiv_harvester.py
+import os
+import re
+import threading
+import time
+import requests
+from services.arxiv_atom import parse_feed
+from services.http_cache import cached_get
+from storage.corpus_store import get_corpus_store
+
+ARXIV_API = os.getenv("ARXIV_API", "http://export.arxiv.org/api/query")
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+# arXiv asks clients to wait 3 seconds between consecutive API calls
+ARXIV_PAGE_DELAY = float(os.getenv("ARXIV_PAGE_DELAY", "3"))
+ARXIV_TIMEOUT = float(os.getenv("ARXIV_TIMEOUT", "30"))
+ARXIV_CACHE_TTL = float(os.getenv("ARXIV_CACHE_TTL", "3600"))
+# Upper bound on entries fetched per requested paper when entries fall outside the window
+ARXIV_MAX_OVERFETCH = int(os.getenv("ARXIV_MAX_OVERFETCH", "3"))
+
+_session = None
+_session_lock = threading.Lock()
+_throttle_lock = threading.Lock()
+_last_request_at = 0.0
+
+def get_session():
+    """Shared HTTP session so paged requests reuse one keep-alive connection"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
+    return _session
+
+def _wait_politely(delay):
+    """Space consecutive arXiv calls from this process at least `delay` seconds apart"""
+    global _last_request_at
+    with _throttle_lock:
+        wait = _last_request_at + delay - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request_at = time.monotonic()
+
+class ArxivHarvester:
+    """Pages through arXiv search results with `start` offsets, yielding papers page by page.
+
+    Every parsed page is also written to the local corpus store (when enabled),
+    so any fetch path can later be answered offline.
+    """
+
+    def __init__(self, page_size=ARXIV_PAGE_SIZE, page_delay=ARXIV_PAGE_DELAY, api_url=ARXIV_API,
+                 corpus_store=None):
+        self.page_size = page_size
+        self.page_delay = page_delay
+        self.api_url = api_url
+        self.corpus_store = corpus_store if corpus_store is not None else get_corpus_store()
+
+    def fetch_page(self, search_query, start, max_results):
+        """Fetch one page; returns (papers, entries_fetched, total_results)"""
+        # Fresh cache hits skip the polite delay; only real requests are throttled
+        response = cached_get(
+            self.api_url,
+            params={"search_query": search_query, "start": start, "max_results": max_results},
+            ttl=ARXIV_CACHE_TTL,
+            timeout=ARXIV_TIMEOUT,
+            throttle=lambda: _wait_politely(self.page_delay),
+            session=get_session()
+        )
+        response.raise_for_status()
+        papers, fetched, total = parse_feed(response.content)
+
+        if papers and self.corpus_store is not None:
+            try:
+                self.corpus_store.add_papers(papers)
+            except Exception as e:
+                print(f"Warning: could not write papers to corpus store: {e}")
+
+        return papers, fetched, total
+
+    def iter_pages(self, search_query, max_results, start=0):
+        """Yield lists of papers until max_results entries were requested or results run out"""
+        offset = start
+        end = start + max_results
+        while offset < end:
+            page_size = min(self.page_size, end - offset)
+            papers, fetched, total = self.fetch_page(search_query, offset, page_size)
+            if not fetched:
+                return
+            yield papers
+            offset += page_size
+            if total is not None and offset >= total:
+                return
+
+    def harvest(self, search_query, max_results, start=0):
+        """Collect every page into a single list"""
+        papers = []
+        for page in self.iter_pages(search_query, max_results, start):
+            papers.extend(page)
+        return papers
+
+    def iter_window(self, query, start_year, end_year, max_results, stats=None):
+        """Yield in-window papers page by page until max_results are kept.
+
+        The year range is sent to arXiv as a submittedDate filter, so normally
+        every fetched entry is kept; the client-side check only guards against
+        entries whose published date disagrees with the filter. stats, if given,
+        is filled with pages/fetched/kept/discarded counts.
+        """
+        if stats is None:
+            stats = {}
+        stats.update({"pages": 0, "fetched": 0, "kept": 0, "discarded": 0})
+        search_query = build_search_query(query, start_year, end_year)
+        fetch_limit = max_results * ARXIV_MAX_OVERFETCH
+        offset = 0
+        while stats["kept"] < max_results and stats["fetched"] < fetch_limit:
+            page_size = min(self.page_size, max_results - stats["kept"])
+            papers, fetched, total = self.fetch_page(search_query, offset, page_size)
+            if not fetched:
+                break
+            in_window = [paper for paper in papers if start_year <= paper["year"] <= end_year]
+            stats["pages"] += 1
+            stats["fetched"] += fetched
+            stats["kept"] += len(in_window)
+            stats["discarded"] += fetched - len(in_window)
+            offset += fetched
+            yield in_window
+            if total is not None and offset >= total:
+                break
+
+    def harvest_window(self, query, start_year, end_year, max_results, stats=None):
+        """Collect up to max_results in-window papers into a single list"""
+        papers = []
+        for page in self.iter_window(query, start_year, end_year, max_results, stats):
+            papers.extend(page)
+        return papers
+
+# Quoted phrases stay together; everything else is split on whitespace
+QUERY_TERM_RE = re.compile(r'"[^"]+"|[^\s"]+')
+
+def build_search_query(query, start_year=None, end_year=None):
+    """arXiv search_query for a free-text query, optionally restricted to a submission year range.
+
+    Terms are grouped explicitly so the date filter applies to the whole query,
+    not just the last term:
+
+    >>> build_search_query('graph learning', 2020, 2021)
+    '(all:graph AND all:learning) AND submittedDate:[202001010000 TO 202112312359]'
+    >>> build_search_query('"neural network" pruning')
+    '(all:"neural network" AND all:pruning)'
+    """
+    terms = QUERY_TERM_RE.findall(query) or [query]
+    search_query = "(" + " AND ".join(f"all:{term}" for term in terms) + ")"
+    if start_year is not None or end_year is not None:
+        low = f"{start_year or 1991}01010000"
+        high = f"{end_year or 9999}12312359"
+        search_query += f" AND submittedDate:[{low} TO {high}]"
+    return search_query
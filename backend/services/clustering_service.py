@@ -1,11 +1,451 @@
 # services/clustering_service.py
-from sklearn.cluster import KMeans
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import silhouette_score
 from sklearn.metrics.pairwise import cosine_distances
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import Normalizer
+from threadpoolctl import threadpool_limits
+from services.embedding_service import get_embedding_service
+from services.feature_store import FEATURE_STORE_ENABLED, get_feature_store
+
+CLUSTERING_ALGORITHM = os.getenv("CLUSTERING_ALGORITHM", "auto")  # auto | kmeans | minibatch
+ALGORITHMS = ("auto", "kmeans", "minibatch")
+# auto keeps full-batch KMeans (n_init=10) for small corpora and switches to mini-batch above this size
+CLUSTERING_MINIBATCH_THRESHOLD = int(os.getenv("CLUSTERING_MINIBATCH_THRESHOLD", "5000"))
+CLUSTERING_CHUNK_SIZE = int(os.getenv("CLUSTERING_CHUNK_SIZE", "4096"))
+CLUSTERING_MINIBATCH_EPOCHS = int(os.getenv("CLUSTERING_MINIBATCH_EPOCHS", "3"))
+CLUSTERING_MAX_FEATURES = int(os.getenv("CLUSTERING_MAX_FEATURES", "2000"))
+# tfidf: sparse TF-IDF over abstracts; embedding: cached sentence embeddings of title and abstract
+CLUSTERING_FEATURES = os.getenv("CLUSTERING_FEATURES", "tfidf")
+FEATURE_MODES = ("tfidf", "embedding")
+# Optional LSA stage for TF-IDF features: truncated SVD to CLUSTERING_LSA_COMPONENTS dimensions, then
+# L2 normalization. Fitted once per corpus and reused by the k sweep and later re-clusterings.
+CLUSTERING_LSA = os.getenv("CLUSTERING_LSA", "false").lower() not in ("0", "false", "no")
+CLUSTERING_LSA_COMPONENTS = int(os.getenv("CLUSTERING_LSA_COMPONENTS", "100"))
+# Automatic k: when no k is requested, sweep CLUSTERING_K_MIN..CLUSTERING_K_MAX in parallel and keep the
+# best sampled silhouette; otherwise fall back to the min(max(3, n // 5), 8) heuristic
+CLUSTERING_AUTO_K = os.getenv("CLUSTERING_AUTO_K", "true").lower() not in ("0", "false", "no")
+CLUSTERING_K_MIN = int(os.getenv("CLUSTERING_K_MIN", "3"))
+CLUSTERING_K_MAX = int(os.getenv("CLUSTERING_K_MAX", "12"))
+CLUSTERING_K_WORKERS = int(os.getenv("CLUSTERING_K_WORKERS", str(os.cpu_count() or 1)))
+# Candidate fits run on at most this many rows and are scored on at most CLUSTERING_SILHOUETTE_SAMPLE of them
+CLUSTERING_K_SAMPLE = int(os.getenv("CLUSTERING_K_SAMPLE", "2000"))
+CLUSTERING_SILHOUETTE_SAMPLE = int(os.getenv("CLUSTERING_SILHOUETTE_SAMPLE", "1000"))
+# Seconds the whole sweep may take; candidates not scored by then are dropped
+CLUSTERING_K_BUDGET = float(os.getenv("CLUSTERING_K_BUDGET", "2.0"))
+# Best silhouette below which the sweep found no real structure and the heuristic k is kept
+CLUSTERING_K_MIN_SILHOUETTE = float(os.getenv("CLUSTERING_K_MIN_SILHOUETTE", "0.02"))
+
+# threadpool_limits sets the OpenMP thread count for the whole process, so only one k sweep at a
+# time may hold a limit, and it is only lifted once that sweep's fits have stopped
+_k_selection_lock = threading.Lock()
+
+def extract_keywords(text, top_n=5):
+    """Extract top keywords from text"""
+    if not text:
+        return []
+
+    # Simple keyword extraction - find important terms
+    words = re.findall(r'\b[a-z]{4,}\b', text.lower())
+    # Filter common stop words
+    stop_words = {'this', 'that', 'these', 'those', 'with', 'from', 'have', 'been', 'were',
+                  'their', 'there', 'which', 'would', 'could', 'should', 'about', 'using',
+                  'based', 'paper', 'study', 'research', 'method', 'approach', 'results',
+                  'propose', 'present', 'show', 'demonstrate', 'analysis', 'evaluation'}
+    words = [w for w in words if w not in stop_words and len(w) > 3]
+
+    word_counts = Counter(words)
+    return [word for word, _ in word_counts.most_common(top_n)]
+
+def generate_cluster_name(papers_in_cluster):
+    """Generate a meaningful cluster name from papers"""
+    if not papers_in_cluster:
+        return "Unknown Cluster"
+
+    # Combine all abstracts and titles
+    all_text = " ".join([
+        (p.get("title", "") + " " + p.get("abstract", "")).lower()
+        for p in papers_in_cluster[:10]  # Use first 10 papers
+    ])
+
+    # Extract keywords
+    keywords = extract_keywords(all_text, top_n=3)
+
+    if keywords:
+        # Create name from top keywords
+        name = " ".join([kw.capitalize() for kw in keywords[:2]])
+        if len(name) < 10:
+            name = " ".join([kw.capitalize() for kw in keywords[:3]])
+        return name[:50]  # Limit length
+
+    # Fallback: use common terms from titles
+    title_words = []
+    for p in papers_in_cluster[:5]:
+        title = p.get("title", "")
+        if title:
+            words = re.findall(r'\b[A-Z][a-z]+\b', title)
+            title_words.extend(words[:3])
+
+    if title_words:
+        common_words = Counter(title_words).most_common(2)
+        if common_words:
+            return " ".join([word for word, _ in common_words])
+
+    return f"Research Cluster {len(papers_in_cluster)}"
+
+def get_key_papers(papers_in_cluster, max_papers=3):
+    """Get key papers from cluster - prioritize by year and title quality"""
+    if not papers_in_cluster:
+        return []
+
+    # Sort by year (most recent first), then by title length (more descriptive)
+    sorted_papers = sorted(
+        papers_in_cluster,
+        key=lambda p: (p.get("year", 0), len(p.get("title", ""))),
+        reverse=True
+    )
+
+    key_papers = []
+    for p in sorted_papers[:max_papers]:
+        title = p.get("title", "Untitled")
+        year = p.get("year", "")
+        authors = p.get("authors", [])
+
+        # Format: "Title (Year)" or "Title (First Author, Year)"
+        if authors and isinstance(authors, list) and len(authors) > 0:
+            first_author = authors[0].split()[-1] if authors[0] else ""
+            paper_str = f"{title} ({first_author} et al., {year})" if year else title
+        else:
+            paper_str = f"{title} ({year})" if year else title
+
+        key_papers.append(paper_str)
+
+    return key_papers
+
+def default_k(n):
+    """Heuristic cluster count: between 3 and 8, based on paper count"""
+    return min(max(3, n // 5), 8)
+
+def clustering_text(paper):
+    """Document clustered for a paper: its abstract, or the title when there is none"""
+    return paper.get("abstract", "") or paper.get("title", "")
+
+def candidate_ks(n, k_min=CLUSTERING_K_MIN, k_max=CLUSTERING_K_MAX):
+    """k values worth trying for n papers: at least three papers per cluster on average"""
+    high = min(k_max, max(2, n // 3))
+    return list(range(min(k_min, high), high + 1))
+
+def summarize_clusters(papers, labels):
+    """Group papers by label into cluster dicts (name, trajectory, key papers), largest first"""
+    clusters = {}
+    for label, paper in zip(labels, papers):
+        clusters.setdefault(label, []).append(paper)
+
+    results = []
+    for cid, plist in clusters.items():
+        if not plist:
+            continue
+
+        years = [p.get("year", 2020) for p in plist if p.get("year")]
+        avg_year = np.mean(years) if years else 2020
+
+        # Determine trajectory based on average year
+        if avg_year > 2022:
+            trend = "Rising"
+        elif avg_year < 2020:
+            trend = "Declining"
+        elif len(plist) > 15:
+            trend = "Saturating"
+        else:
+            trend = "Stable"
+
+        # Get year distribution for timeline
+        year_distribution = Counter([p.get("year", 2020) for p in plist if p.get("year")])
+
+        results.append({
+            "cluster_id": str(cid),
+            "name": generate_cluster_name(plist),
+            "paper_count": len(plist),
+            "trajectory": trend,
+            "papers": plist,
+            "key_papers": get_key_papers(plist, max_papers=3),
+            "avg_year": float(avg_year),
+            "year_distribution": dict(year_distribution)
+        })
+
+    # Sort by paper count (descending)
+    results.sort(key=lambda x: x["paper_count"], reverse=True)
+    return results
+
+def iter_chunks(n, chunk_size, rng=None):
+    """Row index chunks of roughly chunk_size covering range(n), shuffled when rng is given.
+
+    Chunks are split evenly so none is much smaller than the others (the first
+    partial_fit needs at least k rows).
+    """
+    order = rng.permutation(n) if rng is not None else np.arange(n)
+    return np.array_split(order, max(1, -(-n // chunk_size)))
 
 class ClusteringService:
-    def cluster(self, embeddings, k=4):
-        model = KMeans(n_clusters=k, random_state=42)
-        labels = model.fit_predict(embeddings)
+    """Single entry point for clustering: features, algorithm choice, fitting and cluster summaries"""
+
+    def __init__(self, algorithm=CLUSTERING_ALGORITHM, minibatch_threshold=CLUSTERING_MINIBATCH_THRESHOLD,
+                 chunk_size=CLUSTERING_CHUNK_SIZE, epochs=CLUSTERING_MINIBATCH_EPOCHS,
+                 max_features=CLUSTERING_MAX_FEATURES, auto_k=CLUSTERING_AUTO_K, k_workers=CLUSTERING_K_WORKERS,
+                 k_sample=CLUSTERING_K_SAMPLE, silhouette_sample=CLUSTERING_SILHOUETTE_SAMPLE,
+                 k_budget=CLUSTERING_K_BUDGET, k_min_silhouette=CLUSTERING_K_MIN_SILHOUETTE, feature_store=None, features=CLUSTERING_FEATURES,
+                 embedding_service=None, lsa=CLUSTERING_LSA, lsa_components=CLUSTERING_LSA_COMPONENTS):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown clustering algorithm '{algorithm}' (expected one of {', '.join(ALGORITHMS)})")
+        if features not in FEATURE_MODES:
+            raise ValueError(f"Unknown clustering features '{features}' (expected one of {', '.join(FEATURE_MODES)})")
+        self.features = features
+        self.lsa = lsa
+        self.lsa_components = lsa_components
+        self._embedding_service = embedding_service
+        self.algorithm = algorithm
+        self.minibatch_threshold = minibatch_threshold
+        self.chunk_size = chunk_size
+        self.epochs = epochs
+        self.max_features = max_features
+        self.auto_k = auto_k
+        self.k_workers = k_workers
+        self.k_sample = k_sample
+        self.silhouette_sample = silhouette_sample
+        self.k_budget = k_budget
+        self.k_min_silhouette = k_min_silhouette
+        self.feature_store = feature_store or (get_feature_store() if FEATURE_STORE_ENABLED else None)
+
+    def resolve_algorithm(self, n, algorithm=None):
+        algorithm = algorithm or self.algorithm
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown clustering algorithm '{algorithm}' (expected one of {', '.join(ALGORITHMS)})")
+        if algorithm == "auto":
+            return "minibatch" if n > self.minibatch_threshold else "kmeans"
+        return algorithm
+
+    @property
+    def embedding_service(self):
+        # Resolved on first use so TF-IDF-only deployments never touch the embedding model
+        if self._embedding_service is None:
+            self._embedding_service = get_embedding_service()
+        return self._embedding_service
+
+    @property
+    def tfidf_namespace(self):
+        """Feature store namespace for TF-IDF matrices built with these settings"""
+        return f"tfidf-{self.max_features}"
+
+    def make_vectorizer(self):
+        return TfidfVectorizer(stop_words="english", max_features=self.max_features, min_df=1)
+
+    def reduce(self, papers, X):
+        """LSA-reduce a TF-IDF matrix to dense unit rows; returns (reduced, info), or (X, None) if X is too small"""
+        n_components = min(self.lsa_components, X.shape[0] - 1, X.shape[1] - 1)
+        if n_components < 2:
+            return X, None
+
+        def make_lsa():
+            return make_pipeline(TruncatedSVD(n_components=n_components, random_state=42), Normalizer(copy=False))
+
+        def describe(lsa):
+            return {
+                "components": n_components,
+                "explained_variance": round(float(lsa[0].explained_variance_ratio_.sum()), 4)
+            }
+
+        if self.feature_store is not None:
+            reduced, info, cached = self.feature_store.reduced(
+                f"{self.tfidf_namespace}-lsa{n_components}", papers, X, make_lsa, describe
+            )
+            return reduced, {**info, "cached": cached}
+
+        lsa = make_lsa()
+        start = time.perf_counter()
+        reduced = lsa.fit_transform(X).astype(np.float32)
+        return reduced, {"seconds": round(time.perf_counter() - start, 3), **describe(lsa), "cached": False}
+
+    def vectorize(self, papers, features=None):
+        """Feature matrix over the papers and how it was built, or (None, info) if there is no text.
+
+        tfidf: with a feature store, a corpus seen before (or mostly seen
+        before) reuses the fitted vocabulary and only transforms the papers that
+        are new. embedding: dense normalized vectors from the embedding cache;
+        only papers never embedded before are encoded.
+        """
+        features = features or self.features
+        if features not in FEATURE_MODES:
+            raise ValueError(f"Unknown clustering features '{features}' (expected one of {', '.join(FEATURE_MODES)})")
+        if not any(clustering_text(p) for p in papers):
+            return None, {"source": "empty", "new_rows": 0}
+        if features == "embedding":
+            X, encoded = self.embedding_service.cached_embeddings(papers)
+            return X, {"source": "embeddings", "new_rows": encoded}
+        if self.feature_store is not None:
+            return self.feature_store.features(self.tfidf_namespace, papers, clustering_text, self.make_vectorizer)
+        info = {"source": "fitted", "new_rows": len(papers)}
+        try:
+            return self.make_vectorizer().fit_transform([clustering_text(p) for p in papers]), info
+        except ValueError:
+            # Only stop words or empty documents
+            return None, info
+
+    def fit_kmeans(self, X, k):
+        model = KMeans(n_clusters=k, random_state=42, n_init=10)
+        return model.fit_predict(X), model
+
+    def fit_minibatch(self, X, k):
+        """Mini-batch k-means fed chunk by chunk with partial_fit, then labelled chunk by chunk.
+
+        Centers are seeded by full KMeans on the first chunk: partial_fit only
+        tries one k-means++ initialisation, which often merges two topics.
+        """
+        n = X.shape[0]
+        chunk_size = max(self.chunk_size, k)
+        rng = np.random.RandomState(42)
+        chunks = iter_chunks(n, chunk_size, rng)
+        seed = KMeans(n_clusters=k, random_state=42, n_init=10).fit(X[chunks[0]])
+        model = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=chunk_size,
+                                init=seed.cluster_centers_, n_init=1)
+        for epoch in range(max(1, self.epochs)):
+            for rows in chunks if epoch == 0 else iter_chunks(n, chunk_size, rng):
+                model.partial_fit(X[rows])
+        labels = np.concatenate([model.predict(X[rows]) for rows in iter_chunks(n, chunk_size)])
+        return labels, model
+
+    def fit_predict(self, X, k, algorithm):
+        if algorithm == "minibatch":
+            return self.fit_minibatch(X, k)
+        return self.fit_kmeans(X, k)
+
+    def _score_k(self, X, k, deadline):
+        """Sampled silhouette of a KMeans fit with k clusters, or None if the budget ran out first"""
+        if time.perf_counter() > deadline:
+            return None
+        labels = KMeans(n_clusters=k, random_state=42, n_init=3).fit_predict(X)
+        if len(set(labels)) < 2:
+            return None
+        sample_size = min(self.silhouette_sample, X.shape[0])
+        return float(silhouette_score(X, labels, sample_size=sample_size, random_state=42))
+
+    def select_k(self, X, ks=None):
+        """Pick k by sampled silhouette, evaluating candidates in parallel on one row sample of X.
+
+        Returns (k, info); info lists every score that finished within the
+        latency budget. Without any score, or when the best one is below
+        k_min_silhouette, the heuristic k is used. Concurrent sweeps run one
+        at a time; candidates still fitting when the budget runs out are
+        waited for, the rest are cancelled.
+        """
+        n = X.shape[0]
+        ks = ks or candidate_ks(n)
+        start = time.perf_counter()
+        deadline = start + self.k_budget
+        rows = np.random.RandomState(42).choice(n, size=min(n, self.k_sample), replace=False)
+        sample = X[np.sort(rows)]
+
+        workers = max(1, min(self.k_workers, len(ks)))
+        # KMeans already uses OpenMP threads; split the cores between candidates instead of oversubscribing
+        with _k_selection_lock, threadpool_limits(limits=max(1, (os.cpu_count() or 1) // workers),
+                                                  user_api="openmp"):
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="k-selection")
+            # Closest to the heuristic first, so a sweep cut short by the budget still brackets it
+            order = sorted(ks, key=lambda k: (abs(k - default_k(n)), k))
+            futures = {k: executor.submit(self._score_k, sample, k, deadline) for k in order}
+            wait(futures.values(), timeout=self.k_budget)
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        scores = {}
+        for k, future in sorted(futures.items()):
+            if future.done() and not future.cancelled() and future.exception() is None and future.result() is not None:
+                scores[k] = round(future.result(), 4)
+        # Highest silhouette wins (ties go to the smaller k), unless every score is noise
+        heuristic = min(default_k(n), max(ks))
+        if not scores:
+            chosen, method = heuristic, "heuristic"
+        else:
+            chosen = max(scores, key=lambda k: (scores[k], -k))
+            method = "silhouette"
+            if scores[chosen] < self.k_min_silhouette:
+                chosen, method = heuristic, "heuristic_low_silhouette"
+        return chosen, {
+            "method": method,
+            "candidates": ks,
+            "scores": {str(k): v for k, v in scores.items()},
+            "sample": int(sample.shape[0]),
+            "workers": workers,
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+
+    def cluster_papers(self, papers, k=None, algorithm=None, features=None, lsa=None):
+        """Cluster papers by their abstracts; returns (clusters, metadata)
+
+        Without k, k is chosen by select_k (or the size heuristic when auto_k is off).
+        With lsa, TF-IDF features are reduced first and the sweep and fit both run
+        on the reduced matrix.
+        """
+        if not papers:
+            return [], {}
+
+        timings = {}
+        start = time.perf_counter()
+        features = features or self.features
+        X, feature_info = self.vectorize(papers, features)
+        timings["vectorize"] = round(time.perf_counter() - start, 3)
+        if X is None:
+            return [], {}
+
+        lsa_info = None
+        if (self.lsa if lsa is None else lsa) and features == "tfidf":
+            X, lsa_info = self.reduce(papers, X)
+            if lsa_info:
+                timings["lsa"] = 0.0 if lsa_info["cached"] else lsa_info["seconds"]
+
+        k_selection = None
+        if k is None and self.auto_k and X.shape[0] >= 6:
+            k, k_selection = self.select_k(X)
+            timings["select_k"] = k_selection["seconds"]
+        k = k or default_k(len(papers))
+        if X.shape[0] < k:
+            k = max(2, X.shape[0] // 2)
+        algorithm = self.resolve_algorithm(X.shape[0], algorithm)
+
+        start = time.perf_counter()
+        labels, _ = self.fit_predict(X, k, algorithm)
+        timings["fit"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        results = summarize_clusters(papers, labels)
+        timings["summarize"] = round(time.perf_counter() - start, 3)
+
+        metadata = {
+            "algorithm": algorithm,
+            "k": int(k),
+            "papers": len(papers),
+            "features": features,
+            "dimensions": int(X.shape[1]),
+            "feature_source": feature_info["source"],
+            "new_rows": feature_info["new_rows"],
+            "timings": timings
+        }
+        if lsa_info:
+            metadata["lsa"] = lsa_info
+        if k_selection:
+            metadata["k_selection"] = k_selection
+        return results, metadata
+
+    def cluster(self, embeddings, k=4, algorithm=None):
+        algorithm = self.resolve_algorithm(len(embeddings), algorithm)
+        labels, model = self.fit_predict(embeddings, k, algorithm)
         return labels, model.cluster_centers_
 
     def intra_cluster_distance(self, embeddings, labels):
@@ -0,0 +1,60 @@
+# services/corpus_discovery.py
+from services.arxiv_harvester import ArxivHarvester
+
+def iter_discovery(query, start_year, end_year, max_results, stats=None, harvester=None):
+    """Yield pages of in-window papers, answering from the local corpus when it can.
+
+    - Window fully covered and fresh: one page of the papers arXiv returned
+      for this query when the years were fetched (not an FTS search, which
+      would miss arXiv's stemming and author matches).
+    - Nothing covered: stream pages from arXiv (they are written to the corpus
+      as they arrive) and record the coverage and its papers.
+    - Partly covered: fetch only the missing year ranges, then answer locally.
+
+    stats is filled with the harvester counters plus "source" (local, network or
+    mixed) and "local_hits".
+    """
+    if harvester is None:
+        harvester = ArxivHarvester()
+    if stats is None:
+        stats = {}
+    stats.update({"pages": 0, "fetched": 0, "kept": 0, "discarded": 0, "source": "network", "local_hits": 0})
+    store = harvester.corpus_store
+
+    if store is None:
+        yield from harvester.iter_window(query, start_year, end_year, max_results, stats)
+        return
+
+    missing = store.missing_ranges(query, start_year, end_year)
+    if missing == [(start_year, end_year)]:
+        yield from _fetch_range(harvester, store, query, start_year, end_year, max_results, stats)
+        return
+
+    for low, high in missing:
+        for _ in _fetch_range(harvester, store, query, low, high, max_results, stats):
+            pass
+
+    papers = store.covered_papers(query, start_year, end_year, max_results)
+    covered = store.coverage(query, start_year, end_year)
+    if len(papers) < max_results and not all(covered.values()):
+        # Covered but capped earlier at a smaller max_results: refetch the whole window
+        for _ in _fetch_range(harvester, store, query, start_year, end_year, max_results, stats):
+            pass
+        papers = store.covered_papers(query, start_year, end_year, max_results)
+
+    stats["source"] = "mixed" if stats["fetched"] else "local"
+    stats["local_hits"] = len(papers)
+    yield papers
+
+def _fetch_range(harvester, store, query, start_year, end_year, max_results, stats):
+    """Fetch one year range from arXiv, add its counters to stats and record coverage"""
+    range_stats = {}
+    fetched = []
+    for page in harvester.iter_window(query, start_year, end_year, max_results, range_stats):
+        fetched.extend(page)
+        yield page
+    for key in ("pages", "fetched", "kept", "discarded"):
+        stats[key] += range_stats.get(key, 0)
+    # Fewer than requested means arXiv ran out of results for this window
+    store.mark_coverage(query, start_year, end_year, exhausted=range_stats.get("kept", 0) < max_results,
+                        papers=fetched)
@@ -1,71 +1,215 @@
 # services/data_cache.py
 from storage.object_store import ObjectStore
+from storage.sqlite_object_store import SQLiteObjectStore
+from services.fingerprint import corpus_fingerprint, paper_key
 import hashlib
-import json
 import os
-import glob
+import re
+import time
+
+DATA_CACHE_MAX_BYTES = int(os.getenv("DATA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+DATA_CACHE_TTL_SECONDS = float(os.getenv("DATA_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Cache hits are dominated by deserialization, so default to compact binary (set
+# "msgpack+zlib" to trade some latency for ~5x less disk); namespace markers stay JSON
+DATA_CACHE_CODEC = os.getenv("DATA_CACHE_CODEC", "msgpack")
+DATA_CACHE_CODECS = {"ns_": "json"}
+# "file" keeps one file per entry; "sqlite" uses a single WAL database, which is safe for
+# multi-worker servers and keeps prefix listing indexed as the cache grows
+DATA_CACHE_BACKEND = os.getenv("DATA_CACHE_BACKEND", "file")
+DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", "data_cache")
+DATA_CACHE_DB_PATH = os.getenv("DATA_CACHE_DB_PATH", os.path.join(DATA_CACHE_DIR, "cache.db"))
+
+def make_object_store(backend=DATA_CACHE_BACKEND):
+    """Build the object store DataCache writes to"""
+    if backend == "sqlite":
+        return SQLiteObjectStore(db_path=DATA_CACHE_DB_PATH, codec=DATA_CACHE_CODEC, codecs=DATA_CACHE_CODECS)
+    if backend == "file":
+        return ObjectStore(base_path=DATA_CACHE_DIR, codec=DATA_CACHE_CODEC, codecs=DATA_CACHE_CODECS)
+    raise ValueError(f"Unknown DATA_CACHE_BACKEND '{backend}' (expected 'file' or 'sqlite')")
+
+def namespace_slug(query):
+    """Filesystem-safe namespace for a discovery query (no underscores, which delimit keys)"""
+    normalized = " ".join(query.lower().split())
+    slug = re.sub(r"[^a-z0-9]+", "-", normalized).strip("-")[:40]
+    return f"{slug}-{hashlib.blake2b(normalized.encode('utf-8'), digest_size=4).hexdigest()}"
 
 class DataCache:
     """Cache for generated data to avoid regeneration"""
     
     def __init__(self):
-        self.object_store = ObjectStore(base_path="data_cache")
+        self.object_store = make_object_store()
+    
+    def fingerprint(self, papers):
+        """Corpus fingerprint used in every cache key for these papers.
+
+        Hashes paper identities and content versions only, so reordering papers
+        or adding UI-only fields does not change the key.
+        """
+        return corpus_fingerprint(papers)
     
-    def _get_hash(self, data):
-        """Generate hash from data for cache key"""
-        data_str = json.dumps(data, sort_keys=True)
-        return hashlib.md5(data_str.encode()).hexdigest()
+    def save_papers(self, papers, fingerprint=None):
+        """Store the corpus paper table once; cached results refer to it by paper key"""
+        cache_key = f"papers_{fingerprint or self.fingerprint(papers)}"
+        if not self.object_store.exists(cache_key):
+            self.object_store.save_json(cache_key, {
+                "papers": {paper_key(p): p for p in papers}
+            })
+        return cache_key
+    
+    def load_paper_table(self, fingerprint):
+        """Load {paper_key: paper} for a corpus, or None if it is not cached"""
+        data = self.object_store.load_json(f"papers_{fingerprint}")
+        return data.get("papers") if data else None
+    
+    def clusters_key(self, fingerprint, variant=None):
+        """Cache key for one clustering of a corpus; the fingerprint stays the last component"""
+        return f"clusters_{variant}_{fingerprint}" if variant else f"clusters_{fingerprint}"
     
-    def get_clusters(self, papers):
-        """Get cached clusters for given papers"""
-        cache_key = f"clusters_{self._get_hash(papers)}"
-        return self.object_store.load_json(cache_key)
+    def get_clusters(self, papers, variant=None):
+        """Get cached clusters for given papers (variant: non-default algorithm/k settings)"""
+        fingerprint = self.fingerprint(papers)
+        cache_key = self.clusters_key(fingerprint, variant)
+        data = self.object_store.load_json(cache_key)
+        if data:
+            self._touch(cache_key)
+        if not data or "paper_ids" not in data:
+            # Miss, or a legacy entry that still embeds full papers
+            return data
+        
+        # Rehydrate cluster members from the shared paper table
+        table = self.load_paper_table(fingerprint)
+        if table is None:
+            return None
+        clusters = []
+        for cluster, ids in zip(data["clusters"], data["paper_ids"]):
+            clusters.append({**cluster, "papers": [table[k] for k in ids if k in table]})
+        return {"clusters": clusters, "metadata": data.get("metadata")}
     
-    def save_clusters(self, papers, clusters):
-        """Save clusters to cache"""
-        cache_key = f"clusters_{self._get_hash(papers)}"
+    def save_clusters(self, papers, clusters, variant=None, metadata=None):
+        """Save clusters to cache, storing member papers as references"""
+        fingerprint = self.fingerprint(papers)
+        self.save_papers(papers, fingerprint)
+        cache_key = self.clusters_key(fingerprint, variant)
         self.object_store.save_json(cache_key, {
-            "papers": papers,
-            "clusters": clusters
+            "clusters": [{k: v for k, v in c.items() if k != "papers"} for c in clusters],
+            "paper_ids": [[paper_key(p) for p in c.get("papers", [])] for c in clusters],
+            "metadata": metadata
         })
         return cache_key
     
     def get_synthesis(self, papers):
-        """Get cached synthesis for given papers"""
-        cache_key = f"synthesis_{self._get_hash(papers)}"
-        return self.object_store.load_json(cache_key)
+        """Get cached synthesis for given papers (the paper table is not loaded)"""
+        cache_key = f"synthesis_{self.fingerprint(papers)}"
+        data = self.object_store.load_json(cache_key)
+        if data:
+            self._touch(cache_key)
+        return data
     
     def save_synthesis(self, papers, synthesis):
         """Save synthesis to cache"""
-        cache_key = f"synthesis_{self._get_hash(papers)}"
+        fingerprint = self.fingerprint(papers)
+        self.save_papers(papers, fingerprint)
+        cache_key = f"synthesis_{fingerprint}"
         self.object_store.save_json(cache_key, {
-            "papers": papers,
             "synthesis": synthesis
         })
         return cache_key
     
-    def clear_cache(self):
-        """Clear all cached clusters and synthesis data"""
+    def register_corpus(self, papers, namespace):
+        """Record a discovered corpus under its query namespace and enforce the cache budget.
+
+        Other topics' cached clusters and syntheses are left alone; only entries
+        that are expired or least recently used beyond the budget are evicted.
+        """
+        fingerprint = self.fingerprint(papers)
+        self.save_papers(papers, fingerprint)
+        self.object_store.save_json(f"ns_{namespace_slug(namespace)}_{fingerprint}", {
+            "namespace": namespace,
+            "created": time.time()
+        })
+        self.evict(keep=fingerprint)
+        return fingerprint
+    
+    def _touch(self, cache_key):
+        """Refresh the last-access time of an entry on a cache hit"""
+        self.object_store.touch(cache_key)
+    
+    def _corpus_groups(self):
+        """Group stored entries by corpus fingerprint (the suffix after the last underscore)"""
+        groups = {}
+        for name, size, last_access in self.object_store.scan():
+            fingerprint = name.rsplit("_", 1)[-1]
+            group = groups.setdefault(fingerprint, {"keys": [], "size": 0, "last_access": 0.0})
+            group["keys"].append(name)
+            group["size"] += size
+            group["last_access"] = max(group["last_access"], last_access)
+        return groups
+    
+    def _delete_group(self, group):
+        for name in group["keys"]:
+            self.object_store.delete(name)
+    
+    def evict(self, keep=None, max_bytes=None, ttl_seconds=None):
+        """Evict whole corpora that are past their TTL, then LRU until under the byte budget"""
+        max_bytes = DATA_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        ttl_seconds = DATA_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        try:
+            groups = self._corpus_groups()
+            now = time.time()
+            evicted = 0
+            freed = 0
+            
+            # Oldest first, so the LRU pass can stop as soon as the budget is met
+            ordered = sorted(groups.items(), key=lambda item: item[1]["last_access"])
+            total = sum(group["size"] for group in groups.values())
+            for fingerprint, group in ordered:
+                if fingerprint == keep:
+                    continue
+                expired = now - group["last_access"] > ttl_seconds
+                if not expired and total <= max_bytes:
+                    continue
+                self._delete_group(group)
+                total -= group["size"]
+                freed += group["size"]
+                evicted += 1
+            
+            if evicted:
+                print(f"Cache eviction: {evicted} corpora removed, {freed} bytes freed, {total} bytes in use")
+            return {"evicted": evicted, "freed_bytes": freed, "bytes_in_use": total}
+        except Exception as e:
+            print(f"Error evicting cache entries: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"evicted": 0, "freed_bytes": 0, "bytes_in_use": None}
+    
+    def clear_cache(self, namespace=None):
+        """Clear cached data for one query namespace, or everything when namespace is None"""
         try:
-            cache_dir = self.object_store.base_path
-            if os.path.exists(cache_dir):
-                # Find all JSON files in cache directory
-                pattern = os.path.join(cache_dir, "*.json")
-                cache_files = glob.glob(pattern)
-                
-                # Remove all cache files
-                for cache_file in cache_files:
-                    try:
-                        os.remove(cache_file)
-                        print(f"Cleared cache file: {os.path.basename(cache_file)}")
-                    except Exception as e:
-                        print(f"Error removing cache file {cache_file}: {e}")
-                
-                print(f"Cache cleared: {len(cache_files)} files removed")
-                return len(cache_files)
-            else:
-                print("Cache directory does not exist, nothing to clear")
-                return 0
+            if namespace is None:
+                names = self.object_store.list()
+                for name in names:
+                    self.object_store.delete(name)
+                print(f"Cache cleared: {len(names)} entries removed")
+                return len(names)
+            
+            # Drop this namespace's markers; a corpus is only deleted once no other namespace refers to it
+            prefix = f"ns_{namespace_slug(namespace)}_"
+            removed = 0
+            groups = self._corpus_groups()
+            for marker in self.object_store.list(prefix):
+                fingerprint = marker[len(prefix):]
+                self.object_store.delete(marker)
+                group = groups.get(fingerprint)
+                if not group:
+                    continue
+                remaining = [k for k in group["keys"] if k != marker]
+                if not any(k.startswith("ns_") for k in remaining):
+                    for name in remaining:
+                        self.object_store.delete(name)
+                    removed += len(remaining)
+                removed += 1
+            print(f"Cache cleared for namespace '{namespace}': {removed} entries removed")
+            return removed
         except Exception as e:
             print(f"Error clearing cache: {e}")
             import traceback
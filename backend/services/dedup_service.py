@@ -0,0 +1,158 @@
+# services/dedup_service.py
+import os
+import re
+import zlib
+import numpy as np
+from services.fingerprint import normalize_paper_id
+
+DEDUP_MODE = os.getenv("DEDUP_MODE", "merge")  # merge | flag | off
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "32"))
+# Estimated Jaccard similarity of shingle sets above which two papers count as the same work
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.6"))
+SHINGLE_SIZE = 3
+
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+# Odd 64-bit multipliers used to combine word hashes into n-gram hashes
+_NGRAM_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+def shingles(paper, size=SHINGLE_SIZE):
+    """Unique 64-bit hashes of the word n-grams of a paper's title and abstract"""
+    words = WORD_RE.findall(f"{paper.get('title', '')} {paper.get('abstract', '')}".lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    size = min(size, len(words))
+    count = len(words) - size + 1
+    grams = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        # uint64 arithmetic wraps, which is what we want for hashing
+        grams += word_hashes[offset:offset + count] * _NGRAM_MULTIPLIERS[offset % len(_NGRAM_MULTIPLIERS)]
+    return np.unique(grams)
+
+class MinHasher:
+    """MinHash signatures from multiply-shift hashes: the top 32 bits of (a*x + b) mod 2**64"""
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = (rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * 2 + 1)[:, None]
+        self.b = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+        self.num_perm = num_perm
+
+    def signature(self, hashes):
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        return ((self.a * hashes[None, :] + self.b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index; add() tells whether a paper duplicates one already seen.
+
+    Signatures are split into bands; only papers sharing at least one band
+    bucket are compared, so cleaning n papers costs about O(n) instead of
+    O(n^2) pairwise comparisons. Candidates are confirmed by the fraction of
+    equal signature positions (an estimate of Jaccard similarity). Papers with
+    the same arXiv id in another version are duplicates without hashing.
+    """
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, bands=DEDUP_BANDS, threshold=DEDUP_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = []
+        self.keys = []
+        self.identities = {}
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, paper, key):
+        """Index paper under key; returns the key of the paper it duplicates, or None"""
+        identity = normalize_paper_id(paper.get("paper_id") or paper.get("id") or "")
+        if identity and identity in self.identities:
+            return self.identities[identity]
+
+        signature = self.hasher.signature(shingles(paper))
+        band_keys = self._band_keys(signature)
+        candidates = set()
+        for band, band_key in enumerate(band_keys):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self.signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            duplicate_of = self.keys[best]
+            if identity:
+                self.identities[identity] = duplicate_of
+            return duplicate_of
+
+        position = len(self.signatures)
+        self.signatures.append(signature)
+        self.keys.append(key)
+        for band, band_key in enumerate(band_keys):
+            self.buckets[band].setdefault(band_key, []).append(position)
+        if identity:
+            self.identities[identity] = key
+        return None
+
+class DedupService:
+    """Flags or merges near-duplicate papers (arXiv versions, preprint vs. journal copies)"""
+
+    def __init__(self, mode=DEDUP_MODE):
+        self.mode = mode
+        self.index = NearDuplicateIndex()
+        self.canonical = {}
+        self.updated = set()
+        self.stats = {"input": 0, "kept": 0, "duplicates": 0}
+
+    def process(self, papers):
+        """Run a batch through the index; later batches are checked against earlier ones.
+
+        merge: returns only the first-seen copy of each work; the other copies'
+        ids are listed in its "merged_ids". A copy found in a later batch
+        updates a paper that was already returned; see pop_merged(). flag:
+        returns every paper, with "duplicate_of" set on the later copies.
+        off: returns papers unchanged.
+        """
+        if self.mode == "off":
+            return papers
+
+        result = []
+        batch = set()
+        for paper in papers:
+            key = paper.get("paper_id") or paper.get("title", "")
+            duplicate_of = self.index.add(paper, key)
+            self.stats["input"] += 1
+            if duplicate_of is None:
+                self.stats["kept"] += 1
+                self.canonical[key] = paper
+                batch.add(key)
+                result.append(paper)
+                continue
+
+            self.stats["duplicates"] += 1
+            if self.mode == "merge":
+                if key == duplicate_of:
+                    continue  # The same paper again, not another copy of it
+                self.canonical[duplicate_of].setdefault("merged_ids", []).append(key)
+                if duplicate_of not in batch:
+                    self.updated.add(duplicate_of)
+            else:
+                result.append({**paper, "duplicate_of": duplicate_of})
+        return result
+
+    def pop_merged(self):
+        """{canonical key: merged_ids} for papers returned by an earlier batch that gained copies since the last call"""
+        merged = {key: list(self.canonical[key]["merged_ids"]) for key in self.updated}
+        self.updated.clear()
+        return merged
+
+    def deduplicate(self, papers):
+        """One-shot dedup of a complete corpus"""
+        return DedupService(self.mode).process(papers)
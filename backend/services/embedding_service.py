@@ -1,14 +1,72 @@
 # services/embedding_service.py
-from sentence_transformers import SentenceTransformer
+import os
+import threading
 import numpy as np
+from storage.embedding_store import get_embedding_store, text_hash
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+def paper_text(paper):
+    """The text embedded for a paper, shared by clustering, the knowledge base and relevance scoring"""
+    return f"{paper.get('title', '')}. {paper.get('abstract', '')}"
 
 class EmbeddingService:
-    def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, model_name=EMBEDDING_MODEL, store=None):
+        self.model_name = model_name
+        self.store = store
+        self._model = None
+        self._lock = threading.Lock()
 
-    def embed_texts(self, texts):
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+    @property
+    def model(self):
+        """Load the model on first use so importing a service does not pay for it"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def embed_texts(self, texts, normalize=False):
+        embeddings = self.model.encode(
+            texts,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=normalize
+        )
         return embeddings
 
+    def cached_embeddings(self, papers):
+        """Normalized paper embeddings and how many had to be encoded; cached vectors are reused"""
+        texts = [paper_text(p) for p in papers]
+        if self.store is None or not texts:
+            return self.embed_texts(texts, normalize=True), len(texts)
+        hashes = [text_hash(t) for t in texts]
+        vectors = self.store.get(self.model_name, hashes)
+        missing = {h: t for h, t in zip(hashes, texts) if h not in vectors}
+        if missing:
+            encoded = self.embed_texts(list(missing.values()), normalize=True)
+            new = dict(zip(missing, encoded))
+            self.store.put(self.model_name, new)
+            vectors.update(new)
+        return np.vstack([vectors[h] for h in hashes]).astype(np.float32, copy=False), len(missing)
+
+    def embed_papers(self, papers):
+        """Normalized embeddings of papers' title and abstract (one row per paper), encoded once per text"""
+        return self.cached_embeddings(papers)[0]
+
     def cosine_similarity(self, a, b):
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_embedding_service():
+    """Process-wide EmbeddingService so every caller shares one loaded model"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService(store=get_embedding_store())
+    return _service
@@ -0,0 +1,181 @@
+# services/feature_store.py
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sp
+from services.fingerprint import corpus_fingerprint, paper_key
+
+FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE_ENABLED", "true").lower() not in ("0", "false", "no")
+FEATURE_STORE_MAX_BYTES = int(os.getenv("FEATURE_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+# A cached corpus is extended (new rows transformed and appended) when it already holds at least
+# this fraction of the requested papers; otherwise the vectorizer is fitted from scratch
+FEATURE_STORE_MIN_OVERLAP = float(os.getenv("FEATURE_STORE_MIN_OVERLAP", "0.5"))
+# Appended rows only use the vocabulary and IDF weights of the original fit, so refit once the
+# corpus has grown by more than this fraction since then
+FEATURE_STORE_MAX_GROWTH = float(os.getenv("FEATURE_STORE_MAX_GROWTH", "0.5"))
+
+def matrix_nbytes(matrix):
+    if sp.issparse(matrix):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+class FeatureEntry:
+    """A fitted vectorizer and the rows it produced, one per paper key"""
+
+    def __init__(self, vectorizer, keys, matrix, info=None):
+        self.vectorizer = vectorizer
+        self.info = info or {}
+        self.fitted_rows = len(keys)
+        self.lock = threading.Lock()
+        self._set(list(keys), matrix)
+
+    def _set(self, keys, matrix):
+        index = {}
+        for row, key in enumerate(keys):
+            index.setdefault(key, row)
+        # Swapped as one tuple so readers never see keys and matrix out of step
+        self.state = (keys, index, matrix)
+
+    @property
+    def nbytes(self):
+        return matrix_nbytes(self.state[2])
+
+    def missing(self, keys):
+        index = self.state[1]
+        return [key for key in dict.fromkeys(keys) if key not in index]
+
+    def append(self, keys, texts):
+        """Transform only the new papers with the existing vocabulary and append their rows"""
+        with self.lock:
+            current_keys, index, matrix = self.state
+            new = [(key, text) for key, text in zip(keys, texts) if key not in index]
+            if not new:
+                return 0
+            rows = self.vectorizer.transform([text for _, text in new])
+            self._set(current_keys + [key for key, _ in new], sp.vstack([matrix, rows], format="csr"))
+            return len(new)
+
+    def rows(self, keys):
+        """Matrix rows for keys, in order"""
+        _, index, matrix = self.state
+        return matrix[np.fromiter((index[key] for key in keys), dtype=np.int64, count=len(keys))]
+
+class FeatureStore:
+    """Per-corpus cache of fitted vectorizers and their sparse feature matrices.
+
+    Entries are keyed by namespace (the vectorizer settings) and corpus
+    fingerprint. A corpus that mostly overlaps a cached one reuses its entry:
+    only the new papers are transformed and appended, and the new fingerprint
+    becomes an alias of the same entry. Entries are evicted least recently used
+    beyond FEATURE_STORE_MAX_BYTES.
+    """
+
+    def __init__(self, max_bytes=FEATURE_STORE_MAX_BYTES, min_overlap=FEATURE_STORE_MIN_OVERLAP,
+                 max_growth=FEATURE_STORE_MAX_GROWTH):
+        self.max_bytes = max_bytes
+        self.min_overlap = min_overlap
+        self.max_growth = max_growth
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "incremental": 0, "fitted": 0, "appended_rows": 0}
+
+    def _best_entry(self, namespace, keys):
+        """Cached entry in namespace holding the most of keys, with how many it lacks"""
+        with self._lock:
+            candidates = {id(e): e for (ns, _), e in self.entries.items() if ns == namespace}.values()
+        best, best_missing = None, None
+        for entry in candidates:
+            missing = entry.missing(keys)
+            if best is None or len(missing) < len(best_missing):
+                best, best_missing = entry, missing
+        return best, best_missing
+
+    def _put(self, namespace, fingerprint, entry):
+        with self._lock:
+            self.entries[(namespace, fingerprint)] = entry
+            self.entries.move_to_end((namespace, fingerprint))
+            while len(self.entries) > 1:
+                unique = {id(e): e for e in self.entries.values()}
+                if sum(e.nbytes for e in unique.values()) <= self.max_bytes:
+                    break
+                self.entries.popitem(last=False)
+
+    def features(self, namespace, papers, text, make_vectorizer):
+        """Feature rows for papers (in order) and how they were obtained.
+
+        text(paper) gives the document for a paper; make_vectorizer() builds an
+        unfitted vectorizer. Returns (matrix, info), or (None, info) if the
+        vectorizer cannot be fitted on these texts.
+        """
+        fingerprint = corpus_fingerprint(papers)
+        keys = [paper_key(p) for p in papers]
+        with self._lock:
+            entry = self.entries.get((namespace, fingerprint))
+            if entry is not None:
+                self.entries.move_to_end((namespace, fingerprint))
+        if entry is not None and not entry.missing(keys):
+            self.stats["hits"] += 1
+            return entry.rows(keys), {"source": "cache", "new_rows": 0}
+
+        entry, missing = self._best_entry(namespace, keys)
+        if entry is not None:
+            unique = len(set(keys))
+            overlap = 1 - len(missing) / unique
+            grown = len(entry.state[0]) + len(missing) - entry.fitted_rows
+            if overlap >= self.min_overlap and grown <= self.max_growth * entry.fitted_rows:
+                wanted = set(missing)
+                new = [(key, p) for key, p in zip(keys, papers) if key in wanted]
+                appended = entry.append([key for key, _ in new], [text(p) for _, p in new])
+                self._put(namespace, fingerprint, entry)
+                self.stats["incremental"] += 1
+                self.stats["appended_rows"] += appended
+                return entry.rows(keys), {"source": "incremental" if appended else "cache", "new_rows": appended}
+
+        vectorizer = make_vectorizer()
+        try:
+            matrix = vectorizer.fit_transform([text(p) for p in papers]).tocsr()
+        except ValueError:
+            # Only stop words or empty documents
+            return None, {"source": "fitted", "new_rows": len(papers)}
+        self._put(namespace, fingerprint, FeatureEntry(vectorizer, keys, matrix))
+        self.stats["fitted"] += 1
+        return matrix, {"source": "fitted", "new_rows": len(papers)}
+
+    def reduced(self, namespace, papers, matrix, make_reducer, describe=None):
+        """Rows of matrix (one per paper, in order) passed through a reducer fitted on them, cached per corpus.
+
+        make_reducer() builds an unfitted transformer (e.g. an LSA pipeline);
+        describe(reducer) adds fit details to the info. Returns (reduced, info,
+        cached), where info (fit seconds and details) is kept from the original fit.
+        """
+        fingerprint = corpus_fingerprint(papers)
+        keys = [paper_key(p) for p in papers]
+        with self._lock:
+            entry = self.entries.get((namespace, fingerprint))
+            if entry is not None:
+                self.entries.move_to_end((namespace, fingerprint))
+        if entry is not None and not entry.missing(keys):
+            self.stats["hits"] += 1
+            return entry.rows(keys), entry.info, True
+
+        reducer = make_reducer()
+        start = time.perf_counter()
+        reduced = reducer.fit_transform(matrix).astype(np.float32)
+        info = {"seconds": round(time.perf_counter() - start, 3), **(describe(reducer) if describe else {})}
+        self._put(namespace, fingerprint, FeatureEntry(reducer, keys, reduced, info))
+        self.stats["fitted"] += 1
+        return reduced, info, False
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_feature_store():
+    """Return the process-wide feature store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore()
+    return _store
@@ -0,0 +1,114 @@
+# services/fingerprint.py
+import hashlib
+import re
+from functools import lru_cache
+from flask import g, has_request_context
+
+ARXIV_ID_RE = re.compile(r"arxiv\.org/(?:abs|pdf)/(.+?)(?:\.pdf)?$", re.IGNORECASE)
+VERSION_RE = re.compile(r"^(.+?)(v\d+)$")
+_MASK = (1 << 128) - 1
+
+@lru_cache(maxsize=65536)
+def _split_id(raw_id):
+    raw_id = raw_id.strip()
+    match = ARXIV_ID_RE.search(raw_id)
+    if match:
+        raw_id = match.group(1)
+    if raw_id.lower().startswith("arxiv:"):
+        raw_id = raw_id[6:]
+    match = VERSION_RE.match(raw_id)
+    if match:
+        return match.group(1), match.group(2)
+    return raw_id, None
+
+def split_paper_id(raw_id):
+    """Split a paper id into (identity, version), dropping any arXiv URL prefix.
+
+    "http://arxiv.org/abs/2501.02842v1" -> ("2501.02842", "v1")
+    """
+    return _split_id(str(raw_id))
+
+def normalize_paper_id(raw_id):
+    """Version-less identity of a paper id (v1/v2 of the same arXiv paper compare equal)"""
+    return split_paper_id(raw_id)[0]
+
+def _short_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def paper_identity(paper):
+    """Return (identity, content_version) for a paper dict.
+
+    Only these two values feed the corpus fingerprint, so UI-only fields and
+    list order never change cache keys.
+    """
+    raw_id = paper.get("paper_id") or paper.get("id")
+    if raw_id:
+        identity, version = split_paper_id(raw_id)
+    else:
+        identity, version = f"title:{' '.join(paper.get('title', '').lower().split())}", None
+    if version is None:
+        # No arXiv version suffix: the text itself is the content version
+        version = _short_hash(f"{paper.get('title', '')}\0{paper.get('abstract', '')}")
+    return identity, version
+
+def paper_key(paper):
+    """Stable string key for a paper, used to reference it from cached results"""
+    identity, version = paper_identity(paper)
+    return f"{identity}#{version}"
+
+@lru_cache(maxsize=65536)
+def _member_digest(member):
+    identity, version = member
+    digest = hashlib.blake2b(f"{identity}\0{version}".encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest, "big")
+
+def paper_digest(paper):
+    """128-bit digest of a paper's identity and content version"""
+    return _member_digest(paper_identity(paper))
+
+class CorpusFingerprint:
+    """Order-independent fingerprint of a set of papers.
+
+    The value is the sum of per-paper digests modulo 2**128, so papers can be
+    added or removed incrementally without rehashing the rest of the corpus.
+    Duplicate entries (same identity and version) count once.
+    """
+
+    def __init__(self, papers=()):
+        self._members = {}
+        self._value = 0
+        for paper in papers:
+            self.add(paper)
+
+    def add(self, paper):
+        member = paper_identity(paper)
+        if member in self._members:
+            return
+        digest = _member_digest(member)
+        self._members[member] = digest
+        self._value = (self._value + digest) & _MASK
+
+    def remove(self, paper):
+        digest = self._members.pop(paper_identity(paper), None)
+        if digest is not None:
+            self._value = (self._value - digest) & _MASK
+
+    def __len__(self):
+        return len(self._members)
+
+    def hexdigest(self):
+        return f"{self._value:032x}"
+
+def corpus_fingerprint(papers):
+    """Fingerprint a list of papers, memoized for the lifetime of the current request"""
+    if not has_request_context():
+        return CorpusFingerprint(papers).hexdigest()
+
+    memo = g.setdefault("corpus_fingerprints", {})
+    entry = memo.get(id(papers))
+    # Keep a reference to the list so its id() cannot be reused within the request
+    if entry is not None and entry[0] is papers and entry[1] == len(papers):
+        return entry[2]
+    fingerprint = CorpusFingerprint(papers).hexdigest()
+    memo[id(papers)] = (papers, len(papers), fingerprint)
+    return fingerprint
@@ -0,0 +1,270 @@
+# services/http_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "http_cache")
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "3600"))
+# How long past its TTL an entry may still be served when the upstream is unreachable
+HTTP_CACHE_MAX_STALE = float(os.getenv("HTTP_CACHE_MAX_STALE", str(7 * 24 * 3600)))
+HTTP_CACHE_DISK_BYTES = int(os.getenv("HTTP_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+
+# Response headers worth keeping with the body
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+def normalize_url(url, params=None):
+    """Canonical URL: lowercase scheme/host, no fragment, query parameters sorted"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((key, str(value)) for key, value in params.items())
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urlencode(sorted(query)),
+        ""
+    ))
+
+class CachedResponse:
+    """Minimal response object returned by HTTPCache, fresh or from disk"""
+
+    def __init__(self, url, status_code, content, headers, source):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.source = source  # "network", "cache", "revalidated" or "stale"
+
+    @property
+    def from_cache(self):
+        return self.source != "network"
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+class HTTPCache:
+    """On-disk cache of raw GET responses keyed by normalized URL.
+
+    Entries younger than their TTL are served without a request. Older
+    entries are revalidated with If-None-Match / If-Modified-Since (a 304
+    refreshes them), and if the upstream is down or returns 5xx they are
+    served stale for up to max_stale seconds past the TTL.
+
+    The directory is pruned on the first write and whenever it grows past
+    max_disk_bytes: entries unused for longer than default_ttl + max_stale
+    are dropped, then the least recently used until under 90% of the budget.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, default_ttl=HTTP_CACHE_TTL, max_stale=HTTP_CACHE_MAX_STALE,
+                 session=None, max_disk_bytes=HTTP_CACHE_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.max_disk_bytes = max_disk_bytes
+        self.session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Computed by the pruning pass on the first write
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "stale_served": 0, "stores": 0, "evictions": 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            os.utime(meta_path)  # Bump mtime so pruning is LRU rather than FIFO
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def _store(self, url, status_code, headers, body):
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "status_code": status_code,
+            "headers": {name: headers[name] for name in STORED_HEADERS if name in headers},
+            "stored_at": time.time()
+        }
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            # Body first, then metadata: a reader that finds the metadata finds a complete body
+            with open(body_path + suffix, "wb") as f:
+                f.write(body)
+            os.replace(body_path + suffix, body_path)
+            with open(meta_path + suffix, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            size = len(body) + os.path.getsize(meta_path + suffix)
+            os.replace(meta_path + suffix, meta_path)
+        except OSError as e:
+            print(f"Warning: could not write HTTP cache entry for {url}: {e}")
+            return
+        self._count("stores")
+
+        with self._lock:
+            first_write = self._disk_bytes is None
+            if not first_write:
+                self._disk_bytes += size
+            over_budget = first_write or self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict()
+
+    def _scan(self):
+        """Return ([(mtime, size, meta_path, body_path), ...], total_bytes) for the cache directory"""
+        entries = {}
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                base, ext = os.path.splitext(name)
+                if ext not in (".json", ".body"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entry = entries.setdefault(os.path.join(root, base), [0, 0])
+                entry[1] += st.st_size
+                if ext == ".json":
+                    entry[0] = st.st_mtime  # The metadata file is the one touched on use
+        listed = [(mtime, size, f"{base}.json", f"{base}.body") for base, (mtime, size) in entries.items()]
+        return listed, sum(size for _, size, _, _ in listed)
+
+    def _evict(self):
+        """Drop entries unused past default_ttl + max_stale, then the least recently used beyond 90% of the budget"""
+        entries, total = self._scan()
+        expired_before = time.time() - (self.default_ttl + self.max_stale)
+        target = int(self.max_disk_bytes * 0.9)
+        evicted = 0
+        for mtime, size, meta_path, body_path in sorted(entries):
+            if mtime >= expired_before and total <= target:
+                break
+            try:
+                # Metadata first: a reader that finds the metadata expects the body
+                for path in (meta_path, body_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.counters["evictions"] += evicted
+
+    def _refresh(self, url, meta):
+        """Restart the TTL of an entry the upstream confirmed is unchanged"""
+        meta_path, _ = self._paths(url)
+        meta["stored_at"] = time.time()
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except OSError:
+            pass
+
+    def _cached(self, url, meta, body, source):
+        self._count({"cache": "hits", "revalidated": "revalidated", "stale": "stale_served"}[source])
+        return CachedResponse(url, meta["status_code"], body, meta["headers"], source)
+
+    def get(self, url, params=None, ttl=None, timeout=30, headers=None, throttle=None):
+        """GET through the cache.
+
+        throttle, if given, is called right before a network request (and not
+        for fresh cache hits) so callers can apply their own rate limiting.
+        """
+        url = normalize_url(url, params)
+        ttl = self.default_ttl if ttl is None else ttl
+        meta, body = self._load(url)
+        age = time.time() - meta["stored_at"] if meta else None
+
+        if meta and age < ttl:
+            return self._cached(url, meta, body, "cache")
+
+        request_headers = dict(headers or {})
+        if meta:
+            if meta["headers"].get("etag"):
+                request_headers["If-None-Match"] = meta["headers"]["etag"]
+            request_headers["If-Modified-Since"] = meta["headers"].get(
+                "last-modified", formatdate(meta["stored_at"], usegmt=True)
+            )
+        can_serve_stale = meta is not None and age < ttl + self.max_stale
+
+        if throttle is not None:
+            throttle()
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout)
+        except requests.RequestException as e:
+            if can_serve_stale:
+                print(f"Upstream unreachable ({e}); serving stale cache for {url}")
+                return self._cached(url, meta, body, "stale")
+            raise
+
+        if response.status_code == 304 and meta:
+            self._refresh(url, meta)
+            return self._cached(url, meta, body, "revalidated")
+        if response.status_code >= 500 and can_serve_stale:
+            print(f"Upstream returned {response.status_code}; serving stale cache for {url}")
+            return self._cached(url, meta, body, "stale")
+
+        self._count("misses")
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        if response.status_code == 200 and "no-store" not in response_headers.get("cache-control", ""):
+            self._store(url, response.status_code, response_headers, response.content)
+        return CachedResponse(url, response.status_code, response.content, response_headers, "network")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["disk_bytes"] = self._disk_bytes
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_http_cache():
+    """Return the process-wide HTTP cache, or None when HTTP_CACHE_ENABLED is off"""
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HTTPCache()
+    return _cache
+
+def cached_get(url, params=None, ttl=None, timeout=30, headers=None, throttle=None, session=None):
+    """GET through the shared cache, or directly when caching is disabled"""
+    cache = get_http_cache()
+    if cache is not None:
+        return cache.get(url, params=params, ttl=ttl, timeout=timeout, headers=headers, throttle=throttle)
+    if throttle is not None:
+        throttle()
+    response = (session or requests).get(url, params=params, headers=headers, timeout=timeout)
+    return CachedResponse(response.url, response.status_code, response.content, response.headers, "network")
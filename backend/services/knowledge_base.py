@@ -1,12 +1,13 @@
 # services/knowledge_base.py
 from storage.vector_store import VectorStore
-from services.embedding_service import EmbeddingService
+from services.embedding_service import get_embedding_service
+import numpy as np
 import json
 
 class KnowledgeBase:
     def __init__(self):
         self.vector_store = VectorStore(dim=384)
-        self.embedding_service = EmbeddingService()
+        self.embedding_service = get_embedding_service()
         self.is_initialized = False
         self.content_storage = {}  # Store full content by (type, id)
         
@@ -15,18 +16,9 @@ class KnowledgeBase:
         texts = []
         metadata = []
         
-        # Add papers
+        # Add papers (embedded separately through the shared per-paper embedding cache)
         for paper in papers:
             paper_id = paper.get("paper_id") or paper.get("id")
-            text = f"Title: {paper.get('title', '')}\nAbstract: {paper.get('abstract', '')}\n"
-            if paper.get('authors'):
-                text += f"Authors: {', '.join(paper.get('authors', []))}\n"
-            if paper.get('year'):
-                text += f"Year: {paper.get('year', '')}\n"
-            if paper.get('venue'):
-                text += f"Venue: {paper.get('venue', '')}\n"
-            
-            texts.append(text)
             metadata.append({
                 "type": "paper",
                 "id": paper_id,
@@ -140,12 +132,17 @@ class KnowledgeBase:
                     "metrics": exp.get("metrics", [])
                 }
         
-        if not texts:
+        if not metadata:
             return 0
         
-        # Generate embeddings
+        # Generate embeddings: papers first, matching the order of metadata
         try:
-            embeddings = self.embedding_service.embed_texts(texts)
+            embeddings = []
+            if papers:
+                embeddings.append(self.embedding_service.embed_papers(papers))
+            if texts:
+                embeddings.append(self.embedding_service.embed_texts(texts, normalize=True))
+            embeddings = np.vstack(embeddings)
         except Exception as e:
             print(f"Error generating embeddings: {e}")
             return 0
@@ -159,14 +156,14 @@ class KnowledgeBase:
             print(f"Error adding to vector store: {e}")
             return 0
         
-        return len(texts)
+        return len(metadata)
     
     def search(self, query, k=10):
         """Search knowledge base for relevant content"""
         if not self.is_initialized:
             return []
         
-        query_embedding = self.embedding_service.embed_texts([query])[0]
+        query_embedding = self.embedding_service.embed_texts([query], normalize=True)[0]
         results = self.vector_store.search(query_embedding, k=k)
         return results
     
@@ -0,0 +1,155 @@
+# services/llm_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "llm_cache")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_DISK_BYTES = int(os.getenv("LLM_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+class LLMCache:
+    """Content-addressed cache for LLM responses with an in-memory LRU and a size-bounded disk tier"""
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR, max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                 max_disk_bytes=LLM_CACHE_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Computed lazily on the first write
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "disk_evictions": 0
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, prompt, options):
+        """Hash everything that affects the generated text"""
+        payload = json.dumps({"model": model, "prompt": prompt, "options": options}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached response or None"""
+        with self._lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self.memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)["response"]
+            os.utime(path)  # Bump mtime so disk eviction is LRU rather than FIFO
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+
+        with self._lock:
+            self.counters["disk_hits"] += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value, model=None):
+        """Store a response in both tiers"""
+        with self._lock:
+            self._remember(key, value)
+            self.counters["writes"] += 1
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"model": model, "created": time.time(), "response": value}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write LLM cache entry {key[:12]}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan()[1]
+            else:
+                self._disk_bytes += size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict()
+
+    def _scan(self):
+        """Return ([(mtime, size, path), ...], total_bytes) for the disk tier"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        return entries, total
+
+    def _evict(self):
+        """Drop least recently used files until the disk tier is under 90% of its budget"""
+        entries, total = self._scan()
+        target = int(self.max_disk_bytes * 0.9)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.counters["disk_evictions"] += evicted
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self.memory)
+            stats["disk_bytes"] = self._disk_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else None
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Return the process-wide response cache, or None when LLM_CACHE_ENABLED is off"""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
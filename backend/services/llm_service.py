@@ -1,32 +1,211 @@
 # services/llm_service.py
 import requests
+from requests.adapters import HTTPAdapter
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from services.llm_cache import LLMCache, get_llm_cache
+from services.single_flight import SingleFlight
 
 # Load environment variables from .env file if it exists
 load_dotenv()
 
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")  # RTX 3050 6GB should handle llama3 fine
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))  # Keep-alive connections per process
+OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", "30"))  # Seconds a health check stays valid
 
-class LLMService:
-    def _check_ollama_connection(self):
-        """Check if Ollama is accessible"""
+_session = None
+_session_lock = threading.Lock()
+_stats = {"generate_calls": 0, "stream_calls": 0, "health_checks": 0, "health_cache_hits": 0}
+_stats_lock = threading.Lock()
+_inflight = SingleFlight()  # Identical prompts in flight at the same time share one Ollama call
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def get_session():
+    """Return the process-wide pooled session used for all Ollama calls"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+class OllamaHealth:
+    """Cached Ollama health state, refreshed in the background once it goes stale"""
+
+    def __init__(self, ttl=OLLAMA_HEALTH_TTL):
+        self.ttl = ttl
+        self.healthy = None
+        self.checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def probe(self):
+        """Hit /api/tags synchronously and record the result"""
+        _count("health_checks")
         try:
-            response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
+            response = get_session().get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
             response.raise_for_status()
-            return True
-        except:
-            return False
+            healthy = True
+        except requests.exceptions.RequestException:
+            healthy = False
+        self.mark(healthy)
+        return healthy
+
+    def mark(self, healthy):
+        """Record a health observation (from a probe or a real request)"""
+        with self._lock:
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        thread = threading.Thread(target=self.probe, name="ollama-health", daemon=True)
+        thread.start()
+
+    def is_healthy(self):
+        """Return the cached state; only an unknown or unhealthy backend is probed inline"""
+        with self._lock:
+            healthy = self.healthy
+            stale = time.monotonic() - self.checked_at > self.ttl
+            start_refresh = healthy and stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+        
+        if not healthy:
+            # Unknown or down: probing is cheap (connection refused) and lets us recover immediately
+            return self.probe()
+        
+        _count("health_cache_hits")
+        if start_refresh:
+            self._refresh_in_background()
+        return True
+
+_health = OllamaHealth()
+
+def get_pool_stats():
+    """Connection pool and health-cache statistics for the shared Ollama session"""
+    with _stats_lock:
+        stats = dict(_stats)
+    
+    pools = []
+    if _session is not None:
+        adapter = _session.get_adapter(OLLAMA_BASE_URL)
+        container = adapter.poolmanager.pools
+        for key in list(container.keys()):
+            pool = container.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": pool.num_connections,
+                "requests_sent": pool.num_requests,
+                # The pool queue is pre-filled with None placeholders; count real sockets only
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+                "max_size": OLLAMA_POOL_SIZE
+            })
+    
+    stats["pools"] = pools
+    stats["inflight"] = _inflight.stats()
+    stats["healthy"] = _health.healthy
+    stats["health_age_seconds"] = round(time.monotonic() - _health.checked_at, 1) if _health.checked_at else None
+    return stats
+
+class LLMService:
+    def _check_ollama_connection(self):
+        """Check if Ollama is accessible (cached for OLLAMA_HEALTH_TTL seconds)"""
+        return _health.is_healthy()
+    
+    @staticmethod
+    def pool_stats():
+        """Expose shared pool statistics"""
+        return get_pool_stats()
+    
+    @staticmethod
+    def cache_stats():
+        """Expose response cache hit/miss counters"""
+        cache = get_llm_cache()
+        return cache.stats() if cache else {"enabled": False}
+    
+    def _cache_key(self, prompt, temperature):
+        return LLMCache.make_key(OLLAMA_MODEL, prompt, {"temperature": temperature})
+    
+    def _timeout_error(self, timeout=OLLAMA_TIMEOUT):
+        return TimeoutError(f"Ollama request timed out after {timeout:g} seconds. Check if the model '{OLLAMA_MODEL}' is available.")
+    
+    def _connection_error(self):
+        _health.mark(False)
+        return ConnectionError(f"Could not connect to Ollama at {OLLAMA_BASE_URL}. Please ensure Ollama is running.")
+    
+    def _http_error(self, e):
+        """Translate an Ollama HTTP error into a user-facing exception"""
+        if e.response.status_code == 404:
+            return ValueError(f"Model '{OLLAMA_MODEL}' not found. Please ensure the model is installed: ollama pull {OLLAMA_MODEL}")
+        elif e.response.status_code == 500:
+            error_text = e.response.text
+            # Check for CUDA/GPU memory errors
+            if "CUDA" in error_text or "buffer" in error_text or "memory" in error_text.lower():
+                return ValueError(
+                    f"GPU memory allocation failed. The model '{OLLAMA_MODEL}' requires more GPU memory than available.\n\n"
+                    f"Solutions:\n"
+                    f"1. Use a smaller model: Set OLLAMA_MODEL to a smaller model (e.g., 'llama3:8b' or 'mistral')\n"
+                    f"2. Use CPU mode: Restart Ollama with CPU-only mode\n"
+                    f"3. Free GPU memory: Close other applications using GPU\n"
+                    f"4. Check available models: Run 'ollama list' to see installed models\n\n"
+                    f"Original error: {error_text}"
+                )
+            else:
+                return ValueError(f"Ollama server error (500): {error_text}\n\nPlease check if Ollama is running properly: ollama serve")
+        else:
+            return ValueError(f"HTTP error from Ollama: {e.response.status_code} - {e.response.text}")
+    
+    def generate(self, prompt, temperature=0.3, use_cache=True, timeout=None):
+        """Generate text using Ollama LLM.
+
+        Responses are cached by model, prompt and options. use_cache=False skips
+        the lookup, but the fresh response still replaces the cached one.
+        timeout overrides OLLAMA_TIMEOUT for this call.
+        """
+        _count("generate_calls")
+        cache = get_llm_cache()
+        key = self._cache_key(prompt, temperature)
+        if cache and use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        response_text = _inflight.do(key, self._generate_and_cache, prompt, temperature, timeout or OLLAMA_TIMEOUT, key)
+        if response_text is None:
+            # Joined a generate_stream() call that was abandoned before it finished
+            return self.generate(prompt, temperature, use_cache, timeout)
+        return response_text
+    
+    def _generate_and_cache(self, prompt, temperature, timeout, key):
+        response_text = self._generate(prompt, temperature, timeout)
+        cache = get_llm_cache()
+        if cache:
+            cache.put(key, response_text, model=OLLAMA_MODEL)
+        return response_text
     
-    def generate(self, prompt, temperature=0.3):
-        """Generate text using Ollama LLM"""
-        # Check connection first
+    def _generate(self, prompt, temperature, timeout):
+        """Call Ollama's non-streaming generate endpoint"""
+        # Check connection first (served from the health cache when Ollama is up)
         if not self._check_ollama_connection():
             raise ConnectionError(f"Ollama is not accessible at {OLLAMA_BASE_URL}. Please ensure Ollama is running.")
         
         try:
-            response = requests.post(
+            response = get_session().post(
                 f"{OLLAMA_BASE_URL}/api/generate",
                 json={
                     "model": OLLAMA_MODEL,
@@ -36,7 +215,7 @@ class LLMService:
                         "temperature": temperature
                     }
                 },
-                timeout=60  # Reduced from 120 to 60 seconds for faster failure
+                timeout=timeout
             )
             response.raise_for_status()
             result = response.json()
@@ -47,28 +226,100 @@ class LLMService:
             
             return response_text
         except requests.exceptions.Timeout:
-            raise TimeoutError(f"Ollama request timed out after 120 seconds. Check if the model '{OLLAMA_MODEL}' is available.")
+            raise self._timeout_error(timeout)
         except requests.exceptions.ConnectionError:
-            raise ConnectionError(f"Could not connect to Ollama at {OLLAMA_BASE_URL}. Please ensure Ollama is running.")
+            raise self._connection_error()
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                raise ValueError(f"Model '{OLLAMA_MODEL}' not found. Please ensure the model is installed: ollama pull {OLLAMA_MODEL}")
-            elif e.response.status_code == 500:
-                error_text = e.response.text
-                # Check for CUDA/GPU memory errors
-                if "CUDA" in error_text or "buffer" in error_text or "memory" in error_text.lower():
-                    raise ValueError(
-                        f"GPU memory allocation failed. The model '{OLLAMA_MODEL}' requires more GPU memory than available.\n\n"
-                        f"Solutions:\n"
-                        f"1. Use a smaller model: Set OLLAMA_MODEL to a smaller model (e.g., 'llama3:8b' or 'mistral')\n"
-                        f"2. Use CPU mode: Restart Ollama with CPU-only mode\n"
-                        f"3. Free GPU memory: Close other applications using GPU\n"
-                        f"4. Check available models: Run 'ollama list' to see installed models\n\n"
-                        f"Original error: {error_text}"
-                    )
-                else:
-                    raise ValueError(f"Ollama server error (500): {error_text}\n\nPlease check if Ollama is running properly: ollama serve")
-            else:
-                raise ValueError(f"HTTP error from Ollama: {e.response.status_code} - {e.response.text}")
+            raise self._http_error(e)
         except Exception as e:
             raise Exception(f"Unexpected error calling Ollama: {str(e)}")
+    
+    def generate_stream(self, prompt, temperature=0.3, use_cache=True):
+        """Stream text from Ollama, yielding chunks as its NDJSON lines arrive.
+
+        A cache hit is yielded as a single chunk; a fully consumed stream is
+        written back to the same cache generate() uses. Like generate(), an
+        identical prompt already in flight is not sent again: the caller waits
+        for it and gets the finished text as a single chunk.
+        """
+        _count("stream_calls")
+        cache = get_llm_cache()
+        key = self._cache_key(prompt, temperature)
+        if cache and use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        call, leader = _inflight.begin(key)
+        if not leader:
+            response_text = _inflight.wait(call)
+            if response_text is None:
+                # The leading stream was abandoned before it finished; run our own
+                yield from self.generate_stream(prompt, temperature, use_cache)
+            else:
+                yield response_text
+            return
+        
+        chunks = []
+        response_text, error = None, None
+        try:
+            for text in self._generate_stream(prompt, temperature):
+                chunks.append(text)
+                yield text
+            response_text = "".join(chunks)
+            if cache and len(response_text.strip()) >= 10:
+                cache.put(key, response_text, model=OLLAMA_MODEL)
+        except GeneratorExit:
+            raise  # Abandoned by its consumer: followers run their own stream instead of failing
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _inflight.finish(key, call, response_text, error)
+    
+    def _generate_stream(self, prompt, temperature):
+        """Call Ollama's streaming generate endpoint"""
+        if not self._check_ollama_connection():
+            raise ConnectionError(f"Ollama is not accessible at {OLLAMA_BASE_URL}. Please ensure Ollama is running.")
+        
+        try:
+            response = get_session().post(
+                f"{OLLAMA_BASE_URL}/api/generate",
+                json={
+                    "model": OLLAMA_MODEL,
+                    "prompt": prompt,
+                    "stream": True,
+                    "options": {
+                        "temperature": temperature
+                    }
+                },
+                stream=True,
+                # Read timeout applies between chunks, not to the whole generation
+                timeout=(5, OLLAMA_TIMEOUT)
+            )
+            response.raise_for_status()
+        except requests.exceptions.Timeout:
+            raise self._timeout_error()
+        except requests.exceptions.ConnectionError:
+            raise self._connection_error()
+        except requests.exceptions.HTTPError as e:
+            raise self._http_error(e)
+        
+        with response:
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise ValueError(f"Ollama error: {chunk['error']}")
+                    text = chunk.get("response", "")
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        break
+            except requests.exceptions.Timeout:
+                raise self._timeout_error()
+            except requests.exceptions.ConnectionError:
+                raise self._connection_error()
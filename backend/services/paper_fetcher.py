@@ -1,34 +1,169 @@
 # services/paper_fetcher.py
-import feedparser
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from services.arxiv_harvester import ArxivHarvester, build_search_query
+from services.fingerprint import normalize_paper_id
+from storage.corpus_store import get_corpus_store
+from utils.rate_limit import TokenBucket
 
-ARXIV_API = "http://export.arxiv.org/api/query"
-SEMANTIC_SCHOLAR_API = "https://api.semanticscholar.org/graph/v1/paper"
+SEMANTIC_SCHOLAR_API = os.getenv("SEMANTIC_SCHOLAR_API", "https://api.semanticscholar.org/graph/v1/paper")
+SEMANTIC_SCHOLAR_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
+# Citation counts move slowly; a day-old answer is fine
+SEMANTIC_SCHOLAR_CACHE_TTL = float(os.getenv("SEMANTIC_SCHOLAR_CACHE_TTL", str(24 * 3600)))
+SEMANTIC_SCHOLAR_TIMEOUT = float(os.getenv("SEMANTIC_SCHOLAR_TIMEOUT", "30"))
+# The batch endpoint accepts at most 500 ids per request
+SEMANTIC_SCHOLAR_BATCH_SIZE = min(500, int(os.getenv("SEMANTIC_SCHOLAR_BATCH_SIZE", "500")))
+SEMANTIC_SCHOLAR_WORKERS = int(os.getenv("SEMANTIC_SCHOLAR_WORKERS", "4"))
+# Requests per second; unauthenticated clients share roughly 1 rps
+SEMANTIC_SCHOLAR_RATE = float(os.getenv("SEMANTIC_SCHOLAR_RATE", "1"))
+SEMANTIC_SCHOLAR_MAX_RETRIES = int(os.getenv("SEMANTIC_SCHOLAR_MAX_RETRIES", "4"))
+# After a failed lookup (e.g. retries exhausted on 429) skip Semantic Scholar for this many seconds
+SEMANTIC_SCHOLAR_FAILURE_BACKOFF = float(os.getenv("SEMANTIC_SCHOLAR_FAILURE_BACKOFF", "60"))
+CITATION_FIELDS = "citationCount,referenceCount,year"
+# Attach citation counts to every discovered corpus (cached per paper, so repeats are cheap)
+DISCOVERY_CITATIONS = os.getenv("DISCOVERY_CITATIONS", "true").lower() not in ("0", "false", "no")
+# Seconds a discovery request may spend on citation lookups across all its pages; once spent,
+# only cached counts are attached
+DISCOVERY_CITATIONS_BUDGET = float(os.getenv("DISCOVERY_CITATIONS_BUDGET", "2"))
 
-class PaperFetcher:
-    def fetch_arxiv(self, query, max_results=50):
-        url = f"{ARXIV_API}?search_query=all:{query}&start=0&max_results={max_results}"
-        feed = feedparser.parse(url)
-
-        papers = []
-        for e in feed.entries:
-            papers.append({
-                "paper_id": e.id,
-                "title": e.title.strip(),
-                "abstract": e.summary.strip(),
-                "authors": [a.name for a in e.authors],
-                "year": int(e.published[:4]),
-                "url": e.link
-            })
-        return papers
+ARXIV_IDENTITY_RE = re.compile(r"^(\d{4}\.\d{4,5}|[a-z\-]+(\.[A-Z]{2})?/\d{7})$", re.IGNORECASE)
+
+s2_bucket = TokenBucket(rate=SEMANTIC_SCHOLAR_RATE, capacity=1)
+_session = None
+_session_lock = threading.Lock()
+_unavailable_until = 0.0
+
+def get_s2_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
+                if SEMANTIC_SCHOLAR_API_KEY:
+                    _session.headers["x-api-key"] = SEMANTIC_SCHOLAR_API_KEY
+    return _session
+
+def s2_lookup_id(paper_id):
+    """Semantic Scholar id for a paper id: arXiv ids (any URL or version form) become ARXIV:<id>"""
+    identity = normalize_paper_id(paper_id)
+    if ARXIV_IDENTITY_RE.match(identity):
+        return f"ARXIV:{identity}"
+    return identity
 
-    def enrich_with_citations(self, paper_ids):
-        enriched = {}
-        for pid in paper_ids:
-            resp = requests.get(
-                f"{SEMANTIC_SCHOLAR_API}/{pid}",
-                params={"fields": "citationCount,referenceCount,year"}
+def s2_available():
+    """False while a recent lookup failure is being remembered"""
+    return time.monotonic() >= _unavailable_until
+
+def _mark_unavailable():
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + SEMANTIC_SCHOLAR_FAILURE_BACKOFF
+
+def _post_batch(ids, deadline=None):
+    """POST one chunk to the batch endpoint, retrying 429/5xx/timeouts/connection errors with exponential backoff.
+
+    deadline (a time.monotonic() value) caps rate-limit waits, request time and
+    backoff; returns None if it passes before any attempt failed, so the chunk
+    is skipped rather than failed. A chunk that got only failures is remembered
+    for SEMANTIC_SCHOLAR_FAILURE_BACKOFF so later lookups skip the network.
+    """
+    failures = 0
+    for attempt in range(SEMANTIC_SCHOLAR_MAX_RETRIES + 1):
+        timeout = SEMANTIC_SCHOLAR_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        if not s2_bucket.acquire(timeout=None if deadline is None else max(0.0, timeout)):
+            if not failures:
+                return None  # Out of time waiting for our turn, not a Semantic Scholar failure
+            break
+        try:
+            resp = get_s2_session().post(
+                f"{SEMANTIC_SCHOLAR_API}/batch",
+                params={"fields": CITATION_FIELDS},
+                json={"ids": ids},
+                timeout=max(0.1, timeout)
             )
-            if resp.status_code == 200:
-                enriched[pid] = resp.json()
-        return enriched
+        except (requests.Timeout, requests.ConnectionError):
+            resp = None
+        if resp is not None and resp.status_code == 200:
+            return resp.json()
+        if resp is not None and resp.status_code not in (429, 500, 502, 503, 504):
+            resp.raise_for_status()
+        failures += 1
+        if attempt == SEMANTIC_SCHOLAR_MAX_RETRIES:
+            break
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        delay = (float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt) + random.uniform(0, 0.5)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            break
+        time.sleep(delay)
+    if failures:
+        _mark_unavailable()
+    raise Exception(f"Semantic Scholar batch lookup gave up after {failures} failed attempts")
+
+class PaperFetcher:
+    def __init__(self):
+        self.harvester = ArxivHarvester()
+
+    def fetch_arxiv(self, query, max_results=50, start_year=None, end_year=None):
+        if start_year is None and end_year is None:
+            return self.harvester.harvest(build_search_query(query), max_results)
+        return self.harvester.harvest_window(query, start_year or 0, end_year or 9999, max_results)
+
+    def iter_arxiv(self, query, max_results=50):
+        """Yield papers one page at a time instead of waiting for the whole result set"""
+        return self.harvester.iter_pages(build_search_query(query), max_results)
+
+    def enrich_with_citations(self, paper_ids, deadline=None):
+        """Semantic Scholar records for paper_ids, as {paper_id: record} (unknown papers are left out).
+
+        Results are cached per paper in the corpus store; the rest are looked up
+        with the batch endpoint in chunks of up to 500, run concurrently under
+        the shared rate limit. Past deadline, or while a recent failure is
+        remembered, only cached records are returned; a chunk that fails or runs
+        out of time is left out without losing the cached records or other chunks.
+        """
+        lookup = {pid: s2_lookup_id(pid) for pid in paper_ids}
+        store = get_corpus_store()
+        records = store.get_citations(set(lookup.values()), SEMANTIC_SCHOLAR_CACHE_TTL) if store else {}
+
+        missing = sorted({s2_id for s2_id in lookup.values() if s2_id not in records})
+        if not s2_available() or (deadline is not None and time.monotonic() >= deadline):
+            missing = []
+        chunks = [missing[i:i + SEMANTIC_SCHOLAR_BATCH_SIZE] for i in range(0, len(missing), SEMANTIC_SCHOLAR_BATCH_SIZE)]
+        if chunks:
+            workers = max(1, min(len(chunks), SEMANTIC_SCHOLAR_WORKERS))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s2-batch") as executor:
+                futures = [(chunk, executor.submit(_post_batch, chunk, deadline)) for chunk in chunks]
+                for chunk, future in futures:
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        print(f"Warning: citation lookup failed for {len(chunk)} papers: {e}")
+                        continue
+                    if results is None:
+                        continue
+                    # The batch endpoint answers in request order, with null for unknown ids
+                    fetched = dict(zip(chunk, results))
+                    records.update(fetched)
+                    if store:
+                        store.put_citations(fetched)
+
+        return {pid: records[s2_id] for pid, s2_id in lookup.items() if records.get(s2_id)}
+
+    def attach_citations(self, papers, deadline=None):
+        """Set paper["citations"] from Semantic Scholar; lookup failures leave papers untouched"""
+        try:
+            records = self.enrich_with_citations([p["paper_id"] for p in papers if p.get("paper_id")], deadline)
+        except Exception as e:
+            print(f"Warning: citation enrichment failed: {e}")
+            return papers
+        for paper in papers:
+            record = records.get(paper.get("paper_id"))
+            if record and record.get("citationCount") is not None:
+                paper["citations"] = record["citationCount"]
+        return papers
@@ -0,0 +1,149 @@
+# services/reasoning_traces.py
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# background: run advisory reasoning off the request path; skip: never run it; inline: old blocking behaviour
+AGENT_REASONING_MODE = os.getenv("AGENT_REASONING_MODE", "background")
+AGENT_REASONING_WORKERS = int(os.getenv("AGENT_REASONING_WORKERS", "1"))
+# Latency budget: traces that would queue behind this many others, or wait longer than
+# AGENT_REASONING_MAX_WAIT seconds to start, are skipped so they never compete with user requests
+AGENT_REASONING_MAX_PENDING = int(os.getenv("AGENT_REASONING_MAX_PENDING", "8"))
+AGENT_REASONING_MAX_WAIT = float(os.getenv("AGENT_REASONING_MAX_WAIT", "120"))
+AGENT_TRACE_LIMIT = int(os.getenv("AGENT_TRACE_LIMIT", "200"))
+
+class ReasoningTraceStore:
+    """Runs advisory agent reasoning (whose output nothing on the request path reads) and keeps the traces.
+
+    Traces live in a bounded in-memory ring and are exposed through /api/agents/traces.
+    """
+
+    def __init__(self, mode=AGENT_REASONING_MODE, workers=AGENT_REASONING_WORKERS,
+                 max_pending=AGENT_REASONING_MAX_PENDING, max_wait=AGENT_REASONING_MAX_WAIT,
+                 limit=AGENT_TRACE_LIMIT):
+        self.mode = mode
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self.limit = limit
+        self.traces = OrderedDict()
+        self.pending = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-reasoning")
+
+    def _new_trace(self, agent_name, kind, prompt, status):
+        trace = {
+            "id": f"trace_{next(self._ids)}",
+            "agent": agent_name,
+            "kind": kind,
+            "status": status,
+            "prompt": prompt,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "duration": None
+        }
+        with self._lock:
+            self.traces[trace["id"]] = trace
+            while len(self.traces) > self.limit:
+                self.traces.popitem(last=False)
+        return trace
+
+    def _run(self, agent, trace, prompt, context):
+        if time.time() - trace["created_at"] > self.max_wait:
+            trace["status"] = "skipped"
+            trace["error"] = f"Waited more than {self.max_wait}s to start"
+            return
+        trace["status"] = "running"
+        trace["started_at"] = time.time()
+        result = agent.simple_reason(prompt, context=context)
+        trace["finished_at"] = time.time()
+        trace["duration"] = round(trace["finished_at"] - trace["started_at"], 3)
+        if result.get("fallback"):
+            trace["status"] = "failed"
+            trace["error"] = result.get("error")
+        else:
+            trace["status"] = "done"
+            trace["result"] = result.get("result")
+
+    def _run_pending(self, agent, trace, prompt, context):
+        try:
+            self._run(agent, trace, prompt, context)
+        except Exception as e:
+            trace["status"] = "failed"
+            trace["error"] = str(e)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def submit(self, agent, kind, prompt, context=None):
+        """Record a reasoning trace for agent and run it according to the mode; returns the trace id"""
+        if self.mode == "skip":
+            return self._new_trace(agent.name, kind, prompt, "skipped")["id"]
+
+        if self.mode == "inline":
+            trace = self._new_trace(agent.name, kind, prompt, "queued")
+            self._run(agent, trace, prompt, context)
+            return trace["id"]
+
+        with self._lock:
+            over_budget = self.pending >= self.max_pending
+            if not over_budget:
+                self.pending += 1
+        if over_budget:
+            trace = self._new_trace(agent.name, kind, prompt, "skipped")
+            trace["error"] = f"{self.max_pending} traces already pending"
+            return trace["id"]
+
+        trace = self._new_trace(agent.name, kind, prompt, "queued")
+        self.executor.submit(self._run_pending, agent, trace, prompt, context)
+        return trace["id"]
+
+    def record(self, agent_name, kind, prompt, result):
+        """Store reasoning that already ran on the request path (e.g. query expansion)"""
+        trace = self._new_trace(agent_name, kind, prompt, "failed" if result.get("fallback") else "done")
+        trace["result"] = result.get("result")
+        trace["error"] = result.get("error")
+        trace["finished_at"] = trace["created_at"]
+        return trace["id"]
+
+    def get(self, trace_id):
+        with self._lock:
+            trace = self.traces.get(trace_id)
+            return dict(trace) if trace else None
+
+    def list(self, agent=None, kind=None, status=None, limit=50):
+        """Most recent traces first, optionally filtered"""
+        with self._lock:
+            traces = [dict(t) for t in reversed(self.traces.values())]
+        traces = [
+            t for t in traces
+            if (agent is None or t["agent"] == agent)
+            and (kind is None or t["kind"] == kind)
+            and (status is None or t["status"] == status)
+        ]
+        return traces[:limit]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for trace in self.traces.values():
+                counts[trace["status"]] = counts.get(trace["status"], 0) + 1
+            return {"mode": self.mode, "pending": self.pending, "stored": len(self.traces), "by_status": counts}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_trace_store():
+    """Return the process-wide reasoning trace store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ReasoningTraceStore()
+    return _store
@@ -0,0 +1,37 @@
+# services/relevance_service.py
+import os
+import numpy as np
+from services.embedding_service import get_embedding_service
+
+# Cosine similarity between query and title+abstract below which a paper is dropped
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.2"))
+RELEVANCE_TOP_K = int(os.getenv("RELEVANCE_TOP_K", "0")) or None
+
+class RelevanceService:
+    """Scores papers against a query by embedding similarity"""
+
+    def __init__(self, embedding_service=None):
+        self.embedding_service = embedding_service or get_embedding_service()
+
+    def score(self, query, papers):
+        """Cosine similarity of every paper to the query: one query embedding, one matrix product"""
+        if not papers:
+            return np.zeros(0, dtype=np.float32)
+        query_vector = self.embedding_service.embed_texts([query], normalize=True)[0]
+        paper_vectors = self.embedding_service.embed_papers(papers)
+        return paper_vectors @ query_vector
+
+    def filter(self, query, papers, threshold=RELEVANCE_THRESHOLD, top_k=RELEVANCE_TOP_K):
+        """Papers scoring at least threshold (best first, at most top_k), each with a "relevance" field"""
+        scores = self.score(query, papers)
+        order = np.argsort(-scores, kind="stable")
+        if threshold is not None:
+            order = order[scores[order] >= threshold]
+        if top_k:
+            order = order[:top_k]
+        kept = []
+        for index in order:
+            paper = papers[index]
+            paper["relevance"] = round(float(scores[index]), 4)
+            kept.append(paper)
+        return kept
@@ -0,0 +1,72 @@
+# services/single_flight.py
+import threading
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.counters = {"executions": 0, "coalesced": 0}
+
+    def begin(self, key):
+        """Join or start the call for key; returns (call, leader).
+
+        For work that cannot run inside do(), such as a generator: the leader
+        must call finish() when done, followers call wait().
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.counters["executions"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        return call, leader
+
+    def wait(self, call):
+        """The leader's result, or its exception raised here"""
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def finish(self, key, call, result=None, error=None):
+        call.result = result
+        call.error = error
+        with self._lock:
+            self._calls.pop(key, None)
+        call.event.set()
+
+    def do(self, key, fn, *args, **kwargs):
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call)
+
+        result, error = None, None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.finish(key, call, result, error)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
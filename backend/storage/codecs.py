@@ -0,0 +1,90 @@
+# storage/codecs.py
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency: fall back to JSON when it is missing
+    msgpack = None
+
+ZLIB_LEVEL = 1  # Cache payloads are read far more often than written; favour speed over ratio
+
+class Codec:
+    """Serializer for ObjectStore payloads, identified by its file extension"""
+
+    def __init__(self, name, extension, dumps, loads):
+        self.name = name
+        self.extension = extension
+        self._dumps = dumps
+        self._loads = loads
+
+    def encode(self, data):
+        return self._dumps(data)
+
+    def decode(self, blob):
+        return self._loads(blob)
+
+def _json_dumps(data):
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def _json_loads(blob):
+    return json.loads(blob)
+
+def _msgpack_dumps(data):
+    return msgpack.packb(data, use_bin_type=True)
+
+def _msgpack_loads(blob):
+    # Cluster year distributions use int keys, which msgpack rejects by default
+    return msgpack.unpackb(blob, raw=False, strict_map_key=False)
+
+def _compressed(dumps, loads):
+    return (
+        lambda data: zlib.compress(dumps(data), ZLIB_LEVEL),
+        lambda blob: loads(zlib.decompress(blob))
+    )
+
+CODECS = {
+    "json": Codec("json", ".json", _json_dumps, _json_loads),
+    "json+zlib": Codec("json+zlib", ".json.zz", *_compressed(_json_dumps, _json_loads)),
+}
+if msgpack is not None:
+    CODECS["msgpack"] = Codec("msgpack", ".msgpack", _msgpack_dumps, _msgpack_loads)
+    CODECS["msgpack+zlib"] = Codec("msgpack+zlib", ".msgpack.zz", *_compressed(_msgpack_dumps, _msgpack_loads))
+
+# Longest extensions first so ".json.zz" is not mistaken for ".json"
+EXTENSIONS = sorted((codec.extension for codec in CODECS.values()), key=len, reverse=True)
+
+def get_codec(spec):
+    """Resolve a codec name such as "json", "msgpack" or "msgpack+zlib"."""
+    if spec in CODECS:
+        return CODECS[spec]
+    if spec.startswith("msgpack") and msgpack is None:
+        fallback = spec.replace("msgpack", "json", 1)
+        print(f"Warning: msgpack is not installed, using '{fallback}' instead of '{spec}'")
+        return CODECS[fallback]
+    raise ValueError(f"Unknown object store codec '{spec}'. Available: {', '.join(CODECS)}")
+
+def codec_for_filename(filename):
+    """Return (name, codec) for a stored file, or (None, None) if it is not an object file"""
+    for extension in EXTENSIONS:
+        if filename.endswith(extension):
+            codec = next(c for c in CODECS.values() if c.extension == extension)
+            return filename[:-len(extension)], codec
+    return None, None
+
+class CodecMap:
+    """Pick a codec per object name: the longest matching prefix override, else the default"""
+
+    def __init__(self, default="json", overrides=None):
+        self.default = get_codec(default)
+        self.overrides = sorted(
+            ((prefix, get_codec(spec)) for prefix, spec in (overrides or {}).items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+
+    def for_name(self, name):
+        for prefix, codec in self.overrides:
+            if name.startswith(prefix):
+                return codec
+        return self.default
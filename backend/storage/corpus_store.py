@@ -0,0 +1,282 @@
+# storage/corpus_store.py
+import json
+import os
+import re
+import threading
+import time
+from services.fingerprint import normalize_paper_id
+from storage.sqlite_base import SQLiteStore
+
+CORPUS_STORE_ENABLED = os.getenv("CORPUS_STORE_ENABLED", "true").lower() not in ("0", "false", "no")
+CORPUS_DB_PATH = os.getenv("CORPUS_DB_PATH", os.path.join("corpus", "corpus.db"))
+# How long a (query, year) fetch counts as fresh enough to answer locally
+CORPUS_COVERAGE_TTL = float(os.getenv("CORPUS_COVERAGE_TTL", str(24 * 3600)))
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY,
+    identity TEXT NOT NULL UNIQUE,
+    paper_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    abstract TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    venue TEXT,
+    url TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS papers_year ON papers(year);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, content='papers', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract) VALUES ('delete', old.rowid, old.title, old.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract) VALUES ('delete', old.rowid, old.title, old.abstract);
+    INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+END;
+
+CREATE TABLE IF NOT EXISTS citations (
+    identity TEXT PRIMARY KEY,
+    citation_count INTEGER,
+    reference_count INTEGER,
+    s2_paper_id TEXT,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    query_key TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    exhausted INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (query_key, year)
+) WITHOUT ROWID;
+
+-- Which papers arXiv returned for a covered (query, year), in arXiv's order
+CREATE TABLE IF NOT EXISTS coverage_papers (
+    query_key TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    identity TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (query_key, year, identity)
+) WITHOUT ROWID;
+"""
+# 1: coverage answered from coverage_papers; older coverage rows have no membership and are dropped
+SCHEMA_VERSION = 1
+
+def query_key(query):
+    """Normalized form of a search query used to track coverage"""
+    return " ".join(TOKEN_RE.findall(query.lower()))
+
+def fts_query(query):
+    """FTS5 expression matching every term of a free-text query (like arXiv's all:)"""
+    return " ".join(f'"{token}"' for token in TOKEN_RE.findall(query.lower()))
+
+class CorpusStore(SQLiteStore):
+    """Persistent local copy of every fetched paper with an FTS5 index over title and abstract.
+
+    Alongside the papers it records which (query, year) pairs were fetched from
+    arXiv and when, so repeat discovery can be answered locally and only
+    missing or stale years go back to the network.
+    """
+
+    def __init__(self, db_path=CORPUS_DB_PATH, coverage_ttl=CORPUS_COVERAGE_TTL):
+        super().__init__(db_path)
+        self.coverage_ttl = coverage_ttl
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                conn.execute("DELETE FROM coverage")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def add_papers(self, papers):
+        """Insert or refresh papers (a newer arXiv version replaces the stored one)"""
+        now = time.time()
+        rows = [(
+            normalize_paper_id(paper["paper_id"]),
+            paper["paper_id"],
+            paper.get("title", ""),
+            paper.get("abstract", ""),
+            json.dumps(paper.get("authors", [])),
+            paper["year"],
+            paper.get("venue"),
+            paper.get("url"),
+            now
+        ) for paper in papers if paper.get("paper_id") and paper.get("year")]
+        if not rows:
+            return 0
+        with self._conn() as conn:
+            conn.executemany("""
+                INSERT INTO papers (identity, paper_id, title, abstract, authors, year, venue, url, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(identity) DO UPDATE SET
+                    paper_id = excluded.paper_id,
+                    title = excluded.title,
+                    abstract = excluded.abstract,
+                    authors = excluded.authors,
+                    year = excluded.year,
+                    venue = excluded.venue,
+                    url = excluded.url,
+                    fetched_at = excluded.fetched_at
+            """, rows)
+        return len(rows)
+
+    @staticmethod
+    def _row_to_paper(row):
+        paper_id, title, abstract, authors, year, venue, url = row
+        return {
+            "paper_id": paper_id,
+            "title": title,
+            "abstract": abstract,
+            "authors": json.loads(authors),
+            "year": year,
+            "venue": venue,
+            "url": url
+        }
+
+    def search(self, query, start_year, end_year, limit):
+        """Best-ranked (bm25) local papers matching every query term within the year window.
+
+        For offline and ad-hoc lookup only: FTS has no stemming and ignores
+        authors, so it does not reproduce arXiv's results. Discovery answers
+        covered windows with covered_papers instead.
+        """
+        expression = fts_query(query)
+        if not expression:
+            return []
+        rows = self._conn().execute("""
+            SELECT p.paper_id, p.title, p.abstract, p.authors, p.year, p.venue, p.url
+            FROM papers_fts
+            JOIN papers p ON p.rowid = papers_fts.rowid
+            WHERE papers_fts MATCH ? AND p.year BETWEEN ? AND ?
+            ORDER BY papers_fts.rank
+            LIMIT ?
+        """, (expression, start_year, end_year, limit)).fetchall()
+        return [self._row_to_paper(row) for row in rows]
+
+    def mark_coverage(self, query, start_year, end_year, exhausted, papers=()):
+        """Record that query was fetched for every year in the window and which papers arXiv returned.
+
+        papers are the fetched in-window papers in arXiv's order; they replace
+        any membership recorded earlier for these years.
+        """
+        key = query_key(query)
+        now = time.time()
+        members = [(key, paper["year"], normalize_paper_id(paper["paper_id"]), position)
+                   for position, paper in enumerate(papers)
+                   if paper.get("paper_id") and paper.get("year") and start_year <= paper["year"] <= end_year]
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO coverage (query_key, year, exhausted, fetched_at) VALUES (?, ?, ?, ?)",
+                [(key, year, int(exhausted), now) for year in range(start_year, end_year + 1)]
+            )
+            conn.execute(
+                "DELETE FROM coverage_papers WHERE query_key = ? AND year BETWEEN ? AND ?",
+                (key, start_year, end_year)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO coverage_papers (query_key, year, identity, position) VALUES (?, ?, ?, ?)",
+                members
+            )
+
+    def covered_papers(self, query, start_year, end_year, limit):
+        """Papers arXiv returned for query in the covered years of the window, in arXiv's order"""
+        rows = self._conn().execute("""
+            SELECT p.paper_id, p.title, p.abstract, p.authors, p.year, p.venue, p.url
+            FROM coverage_papers c
+            JOIN papers p ON p.identity = c.identity
+            WHERE c.query_key = ? AND c.year BETWEEN ? AND ?
+            ORDER BY c.position, c.year DESC
+            LIMIT ?
+        """, (query_key(query), start_year, end_year, limit)).fetchall()
+        return [self._row_to_paper(row) for row in rows]
+
+    def coverage(self, query, start_year, end_year):
+        """{year: exhausted} for the years of the window with fresh coverage"""
+        cutoff = time.time() - self.coverage_ttl
+        rows = self._conn().execute(
+            "SELECT year, exhausted FROM coverage WHERE query_key = ? AND year BETWEEN ? AND ? AND fetched_at >= ?",
+            (query_key(query), start_year, end_year, cutoff)
+        ).fetchall()
+        return {year: bool(exhausted) for year, exhausted in rows}
+
+    def missing_ranges(self, query, start_year, end_year):
+        """Contiguous (start, end) year ranges of the window without fresh coverage"""
+        covered = self.coverage(query, start_year, end_year)
+        ranges = []
+        for year in range(start_year, end_year + 1):
+            if year in covered:
+                continue
+            if ranges and ranges[-1][1] == year - 1:
+                ranges[-1] = (ranges[-1][0], year)
+            else:
+                ranges.append((year, year))
+        return ranges
+
+    def get_citations(self, identities, max_age):
+        """{identity: record} for identities looked up within max_age seconds.
+
+        record is None for papers Semantic Scholar did not know, so they are
+        not looked up again until the entry expires.
+        """
+        cutoff = time.time() - max_age
+        found = {}
+        rows = self._select_in(
+            "SELECT identity, citation_count, reference_count, s2_paper_id FROM citations "
+            "WHERE fetched_at >= ? AND identity IN ({placeholders})",
+            identities, [cutoff]
+        )
+        for identity, citation_count, reference_count, s2_paper_id in rows:
+            found[identity] = None if s2_paper_id is None else {
+                "citationCount": citation_count,
+                "referenceCount": reference_count,
+                "paperId": s2_paper_id
+            }
+        return found
+
+    def put_citations(self, records):
+        """Store {identity: record or None} from a Semantic Scholar lookup"""
+        now = time.time()
+        rows = [(
+            identity,
+            record.get("citationCount") if record else None,
+            record.get("referenceCount") if record else None,
+            record.get("paperId") if record else None,
+            now
+        ) for identity, record in records.items()]
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO citations (identity, citation_count, reference_count, s2_paper_id, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "papers": conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0],
+            "covered_queries": conn.execute("SELECT COUNT(DISTINCT query_key) FROM coverage").fetchone()[0],
+            "covered_papers": conn.execute("SELECT COUNT(*) FROM coverage_papers").fetchone()[0],
+            "citations": conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+        }
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_corpus_store():
+    """Return the process-wide corpus store, or None when CORPUS_STORE_ENABLED is off"""
+    global _store
+    if not CORPUS_STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CorpusStore()
+    return _store
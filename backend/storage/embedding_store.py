@@ -0,0 +1,77 @@
+# storage/embedding_store.py
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+from storage.sqlite_base import SQLiteStore
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+EMBEDDING_DB_PATH = os.getenv("EMBEDDING_DB_PATH", os.path.join("embeddings", "embeddings.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+"""
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+class EmbeddingStore(SQLiteStore):
+    """Persistent float32 embeddings keyed by model name and a hash of the embedded text.
+
+    Keying on the text rather than a paper id means an edited abstract is
+    re-encoded, and every caller that embeds the same paper text shares one vector.
+    """
+
+    def __init__(self, db_path=EMBEDDING_DB_PATH):
+        super().__init__(db_path)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def get(self, model, hashes):
+        """{text_hash: vector} for the hashes already embedded with model"""
+        found = {}
+        rows = self._select_in(
+            "SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+            dict.fromkeys(hashes), [model]
+        )
+        for key, blob in rows:
+            found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put(self, model, vectors):
+        """Store {text_hash: vector} embedded with model"""
+        now = time.time()
+        rows = [(model, key, len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for key, vector in vectors.items()]
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def stats(self):
+        conn = self._conn()
+        rows = conn.execute("SELECT model, COUNT(*), SUM(LENGTH(vector)) FROM embeddings GROUP BY model").fetchall()
+        return {model: {"vectors": count, "bytes": size} for model, count, size in rows}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_embedding_store():
+    """Return the process-wide embedding store, or None when EMBEDDING_CACHE_ENABLED is off"""
+    global _store
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EmbeddingStore()
+    return _store
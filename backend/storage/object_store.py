@@ -1,21 +1,119 @@
 # storage/object_store.py
 import os
-import json
+import threading
+from storage.codecs import EXTENSIONS, CodecMap, codec_for_filename
 
 class ObjectStore:
-    def __init__(self, base_path="object_store"):
+    """File-per-key object store.
+
+    codec is the default serialization ("json", "json+zlib", "msgpack",
+    "msgpack+zlib"); codecs maps key prefixes to a different codec, e.g.
+    {"ns_": "json"}. Entries written with any codec (including legacy pretty
+    JSON) stay readable after the configuration changes.
+    """
+
+    def __init__(self, base_path="object_store", codec="json", codecs=None):
         self.base_path = base_path
+        self.codecs = CodecMap(codec, codecs)
         os.makedirs(self.base_path, exist_ok=True)
 
+    def _codec_for(self, name):
+        return self.codecs.for_name(name)
+
+    def _path(self, name, extension):
+        return os.path.join(self.base_path, f"{name}{extension}")
+
+    def _find(self, name):
+        """Return (path, codec) of the stored entry, preferring the configured codec"""
+        preferred = self._codec_for(name)
+        path = self._path(name, preferred.extension)
+        if os.path.exists(path):
+            return path, preferred
+        for extension in EXTENSIONS:
+            path = self._path(name, extension)
+            if extension != preferred.extension and os.path.exists(path):
+                return path, codec_for_filename(path)[1]
+        return None, None
+
     def save_json(self, name, data):
-        path = os.path.join(self.base_path, f"{name}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        """Serialize data with the codec configured for name (JSON-compatible values only)"""
+        codec = self._codec_for(name)
+        path = self._path(name, codec.extension)
+        # Write to a temp file and rename so readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(codec.encode(data))
+        os.replace(tmp_path, path)
+        # Drop copies left behind under a previous codec
+        for extension in EXTENSIONS:
+            if extension != codec.extension:
+                stale = self._path(name, extension)
+                if os.path.exists(stale):
+                    os.remove(stale)
         return path
 
+    def exists(self, name):
+        return self._find(name)[0] is not None
+
     def load_json(self, name):
-        path = os.path.join(self.base_path, f"{name}.json")
-        if not os.path.exists(path):
+        path, codec = self._find(name)
+        if path is None:
             return None
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return codec.decode(f.read())
+
+    def delete(self, name):
+        removed = False
+        for extension in EXTENSIONS:
+            try:
+                os.remove(self._path(name, extension))
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def list(self, prefix=""):
+        """Names of stored objects starting with prefix"""
+        names = set()
+        for filename in os.listdir(self.base_path):
+            if not filename.startswith(prefix):
+                continue
+            name, codec = codec_for_filename(filename)
+            if codec is not None:
+                names.add(name)
+        return sorted(names)
+
+    def scan(self, prefix=""):
+        """Yield (name, size, mtime) for every stored object starting with prefix"""
+        with os.scandir(self.base_path) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix):
+                    continue
+                name, codec = codec_for_filename(entry.name)
+                if codec is None:
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield name, st.st_size, st.st_mtime
+
+    def stat(self, name):
+        """Return {"size": bytes, "mtime": epoch seconds} or None"""
+        path, _ = self._find(name)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return {"size": st.st_size, "mtime": st.st_mtime}
+
+    def touch(self, name):
+        """Mark an object as recently used"""
+        path, _ = self._find(name)
+        if path is not None:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,40 @@
+# storage/sqlite_base.py
+import os
+import sqlite3
+import threading
+
+# Values bound per IN (...) query; stays well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+class SQLiteStore:
+    """Shared plumbing for the SQLite-backed stores: a WAL-mode connection per thread and chunked IN lookups"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _conn(self):
+        """One connection per thread; SQLite connections must not be shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _select_in(self, sql, values, params=()):
+        """All rows of sql for values, queried IN_CHUNK_SIZE at a time.
+
+        sql has a {placeholders} slot for the IN list; params are bound before the values.
+        """
+        values = list(values)
+        conn = self._conn()
+        rows = []
+        for i in range(0, len(values), IN_CHUNK_SIZE):
+            chunk = values[i:i + IN_CHUNK_SIZE]
+            rows.extend(conn.execute(sql.format(placeholders=",".join("?" * len(chunk))), [*params, *chunk]).fetchall())
+        return rows
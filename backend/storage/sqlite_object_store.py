@@ -0,0 +1,90 @@
+# storage/sqlite_object_store.py
+import time
+from storage.codecs import CODECS, CodecMap
+from storage.sqlite_base import SQLiteStore
+
+class SQLiteObjectStore(SQLiteStore):
+    """ObjectStore backed by a single SQLite database in WAL mode.
+
+    Same API as ObjectStore. Each write is a single transaction, so readers in
+    other threads or worker processes never see a partial entry, and prefix
+    listing uses the primary-key index instead of a directory scan.
+    """
+
+    def __init__(self, db_path="object_store.db", codec="json", codecs=None):
+        super().__init__(db_path)
+        self.codecs = CodecMap(codec, codecs)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS objects (
+                    name TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+    @staticmethod
+    def _prefix_range(prefix):
+        """[low, high) bounds that select every name starting with prefix via the index"""
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def save_json(self, name, data):
+        codec = self.codecs.for_name(name)
+        blob = codec.encode(data)
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO objects (name, codec, data, size, updated_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, codec.name, blob, len(blob), now, now)
+            )
+        return f"{self.db_path}#{name}"
+
+    def exists(self, name):
+        row = self._conn().execute("SELECT 1 FROM objects WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def load_json(self, name):
+        row = self._conn().execute("SELECT codec, data FROM objects WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        codec_name, blob = row
+        if codec_name not in CODECS:
+            raise ValueError(f"Object '{name}' was stored with codec '{codec_name}', which is not available")
+        return CODECS[codec_name].decode(blob)
+
+    def delete(self, name):
+        with self._conn() as conn:
+            cursor = conn.execute("DELETE FROM objects WHERE name = ?", (name,))
+        return cursor.rowcount > 0
+
+    def list(self, prefix=""):
+        """Names of stored objects starting with prefix"""
+        return [name for name, _, _ in self.scan(prefix)]
+
+    def scan(self, prefix=""):
+        """Yield (name, size, last access time) for every stored object starting with prefix"""
+        if prefix:
+            low, high = self._prefix_range(prefix)
+            rows = self._conn().execute(
+                "SELECT name, size, accessed_at FROM objects WHERE name >= ? AND name < ? ORDER BY name",
+                (low, high)
+            ).fetchall()
+        else:
+            rows = self._conn().execute("SELECT name, size, accessed_at FROM objects ORDER BY name").fetchall()
+        yield from rows
+
+    def stat(self, name):
+        """Return {"size": bytes, "mtime": last access time} or None"""
+        row = self._conn().execute("SELECT size, accessed_at FROM objects WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return {"size": row[0], "mtime": row[1]}
+
+    def touch(self, name):
+        """Mark an object as recently used"""
+        with self._conn() as conn:
+            conn.execute("UPDATE objects SET accessed_at = ? WHERE name = ?", (time.time(), name))
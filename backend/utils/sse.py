@@ -0,0 +1,18 @@
+# utils/sse.py
+import json
+from flask import Response, stream_with_context
+
+def sse_event(event, data):
+    """Format a single Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Wrap a generator of SSE frames in a streaming Flask response"""
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so tokens flush immediately
+        }
+    )
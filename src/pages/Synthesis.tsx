@@ -191,6 +191,9 @@ export default function Synthesis() {
       return;
     }
 
+    // Generating again while a draft is shown asks for a new draft, not the cached one
+    const regenerate = generatedPaper !== null;
+
     try {
       setGeneratingPaper(true);
       setPaperError(null);
@@ -208,6 +211,7 @@ export default function Synthesis() {
           synthesis: synthesisData,
           gaps: gaps,
           experiments: experiments,
+          force_regenerate: regenerate,
         }),
       });
 